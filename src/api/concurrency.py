@@ -0,0 +1,18 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# Blocking work (LLM HTTP calls, retrieval, PyTorch, OCR) runs here instead of on the event loop.
+# Sized by API_BLOCKING_WORKERS; per-backend limits are enforced by the LLM router.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("API_BLOCKING_WORKERS", "32")),
+    thread_name_prefix="api-blocking"
+)
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Runs a blocking callable on the bounded API thread pool and awaits its result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import threading
+
+
+class JobQueue:
+    """
+    Persistent local job queue (SQLite) served by a fixed pool of worker threads.
+
+    Handlers are registered per job kind and called as handler(payload, report), where
+    report(stage=..., progress=..., total=...) records progress. Jobs that were queued or
+    running when the server stopped are picked up again on start(). Each queue has its own
+    database and workers, so separate queues never delay each other's jobs.
+    """
+    def __init__(self, db_path="data/jobs.db", workers=1, name="job"):
+        self.db_path = db_path
+        self.workers = workers
+        self.name = name
+        self.handlers = {}
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress INTEGER DEFAULT 0,
+                    total INTEGER DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def start(self):
+        if self._threads:
+            return
+        # Resume work interrupted by a restart
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            pending = [row[0] for row in conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created")]
+        for job_id in pending:
+            self._queue.put(job_id)
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"{self.name.capitalize()} queue started with {self.workers} workers ({len(pending)} pending jobs)")
+
+    def submit(self, kind, payload):
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created, updated) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now)
+            )
+        self._queue.put(job_id)
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, limit=50):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def _to_dict(self, row):
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _update(self, job_id, **fields):
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            job = self.get(job_id)
+            if job is None or job["status"] != "queued":
+                continue
+
+            self._update(job_id, status="running")
+
+            def report(stage=None, progress=None, total=None):
+                fields = {}
+                if stage is not None:
+                    fields["stage"] = stage
+                if progress is not None:
+                    fields["progress"] = progress
+                if total is not None:
+                    fields["total"] = total
+                if fields:
+                    self._update(job_id, **fields)
+
+            try:
+                result = self.handlers[job["kind"]](job["payload"], report)
+                self._update(job_id, status="done", result=json.dumps(result))
+            except Exception as e:
+                print(f"Job {job_id} ({job['kind']}) failed: {e}")
+                self._update(job_id, status="failed", error=str(e))
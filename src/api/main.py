@@ -1,9 +1,17 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from src.rag.rag_pipeline import RAGPipeline
-from src.ingestion.ingest_books import DataIngestor
+from src.rag.components import LazyComponent
+from src.ingestion.library_catalog import LibraryCatalog
+from src.rag.artifact_cache import ArtifactCache
+from src.rag.study_materials import StudyMaterials, NoContentError
+from src.rag.structured_output import parse_json
+from src.api.jobs import JobQueue
+from src.api.concurrency import run_blocking
+from concurrent.futures import ThreadPoolExecutor
 import os
 import shutil
 import json
@@ -18,9 +26,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Pipeline (Note: This might be heavy for startup)
+# Components load lazily; the startup hook warms them up in parallel (see /ready)
 pipeline = RAGPipeline()
-ingestor = DataIngestor()
+
+def _data_ingestor():
+    from src.ingestion.ingest_books import DataIngestor
+    # OCR for uploads runs in niced worker processes so it cannot starve /chat
+    return DataIngestor(ocr_workers=int(os.getenv("UPLOAD_OCR_WORKERS", "2")))
+
+# EasyOCR is only needed by /upload and /visual-solve
+ocr = LazyComponent("ocr", _data_ingestor)
+
+# Book catalog for /library, updated by DataIngestor as books complete
+catalog = LibraryCatalog(processed_dir="data/processed")
+
+# Generated assessments/mindmaps, keyed by chapter context (see /artifacts/warm)
+materials = StudyMaterials(pipeline, ArtifactCache(os.getenv("ARTIFACT_CACHE_PATH", "data/artifacts.db")))
+
+def run_ingest_job(payload, report):
+    """
+    Background upload job: OCR into a processed JSONL book, then index it.
+    """
+    report(stage="ocr")
+    ingestor = ocr.get()
+    output_path = ingestor.ingest_file(
+        payload["file_path"],
+        progress=lambda done, total: report(progress=done, total=total),
+        raise_errors=True
+    )
+    report(stage="indexing")
+    stats = pipeline.vector_store.index_processed_files(processed_dir=ingestor.processed_dir)
+    report(stage="done")
+    return {"processed_file": os.path.basename(output_path), "index": stats}
+
+# Persistent upload queue; INGEST_WORKERS bounds how many books are processed at once
+jobs = JobQueue(db_path="data/jobs.db", workers=int(os.getenv("INGEST_WORKERS", "1")))
+jobs.register("ingest", run_ingest_job)
+
+# Artifact warming (LLM-bound, can take hours) has its own queue so it never holds up uploads
+warm_jobs = JobQueue(db_path="data/warm_jobs.db", workers=int(os.getenv("ARTIFACT_WARM_WORKERS", "1")), name="warm")
+warm_jobs.register("warm_artifacts", lambda payload, report: materials.warm(catalog.books(), report=report))
+
+@app.on_event("startup")
+async def start_job_queue():
+    jobs.start()
+    warm_jobs.start()
+
+@app.on_event("startup")
+async def warm_up_components():
+    """
+    Builds retrieval and every LLM concurrently in the background; the server accepts
+    requests immediately and /chat works as soon as retrieval and one LLM are ready.
+    """
+    warm_ocr = os.getenv("STARTUP_WARM_OCR", "0") == "1"
+    workers = len(pipeline.components()) + 1 + warm_ocr
+    warmup_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warm-up")
+    # Picks up books added or removed while the server was down
+    warmup_pool.submit(catalog.sync)
+    pipeline.warm_up(warmup_pool)
+    if warm_ocr:
+        warmup_pool.submit(ocr.warm_up)
+    warmup_pool.shutdown(wait=False)
 
 class QueryRequest(BaseModel):
     query: str
@@ -42,14 +108,66 @@ class MissionRequest(BaseModel):
     recent_activity: List[dict]
     persona: str
 
+# JSON Schemas for constrained LLM output
+MISSION_SCHEMA = {
+    "title": "mission",
+    "type": "object",
+    "properties": {
+        "mission_title": {"type": "string"},
+        "description": {"type": "string"},
+        "target_subject": {"type": "string"},
+        "reward_points": {"type": "integer"}
+    },
+    "required": ["mission_title", "description", "target_subject", "reward_points"]
+}
+
+VISUAL_ANALYSIS_SCHEMA = {
+    "title": "visual_analysis",
+    "type": "object",
+    "properties": {
+        "extracted_query": {"type": "string"},
+        "visual_description": {"type": "string"},
+        "search_query": {"type": "string"}
+    },
+    "required": ["extracted_query", "visual_description", "search_query"]
+}
+
 @app.get("/")
 async def root():
     return {"message": "NCERT Solver API is running"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 200 once /chat can be served (retrieval and one LLM loaded), else 503.
+    Reports the load state of every component.
+    """
+    components = {component.name: component.status() for component in pipeline.components() + [ocr]}
+    is_ready = pipeline.ready()
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "components": components}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Cache effectiveness (semantic answer cache, query embedding cache) and LLM provider health.
+    """
+    return {
+        "answer_cache": pipeline.answer_cache.stats() if pipeline.answer_cache else None,
+        "query_embedding_cache": pipeline.vector_store.query_embeddings.stats() if pipeline.retrieval.ready else None,
+        "llm_providers": pipeline.router.stats(),
+        "context_packing": pipeline.context_packer.stats(),
+        "artifact_cache": materials.artifacts.stats(),
+        "reranker": pipeline.reranker.get().stats() if pipeline.reranker is not None and pipeline.reranker.ready else None
+    }
+
 @app.post("/chat")
 async def chat(request: QueryRequest):
     try:
-        response = pipeline.generate_response(
+        response = await run_blocking(
+            pipeline.generate_response,
             query=request.query,
             grade=request.grade,
             subject=request.subject,
@@ -59,6 +177,26 @@ async def chat(request: QueryRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(request: QueryRequest):
+    """
+    Server-Sent Events version of /chat: a "citations" event, then "token" events, then "done".
+    """
+    def events():
+        try:
+            for event, data in pipeline.stream_response(
+                query=request.query,
+                grade=request.grade,
+                subject=request.subject,
+                filename=request.filename
+            ):
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+
+    # Sync generator: Starlette iterates it in a worker thread
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.post("/upload")
 async def upload_document(
     file: UploadFile = File(...),
@@ -73,12 +211,21 @@ async def upload_document(
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
     
-    # Trigger ingestion
-    try:
-        ingestor.ingest_file(file_path)
-        return {"status": "success", "message": f"File {file.filename} uploaded and indexed."}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
+    # Queue ingestion (OCR -> processed JSONL -> indexing); poll /jobs/{job_id} for progress
+    job_id = await run_blocking(jobs.submit, "ingest", {"file_path": file_path})
+    return {"status": "queued", "job_id": job_id, "message": f"File {file.filename} uploaded and queued for indexing."}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_blocking(jobs.get, job_id) or await run_blocking(warm_jobs.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 50):
+    found = await run_blocking(jobs.list, limit=limit) + await run_blocking(warm_jobs.list, limit=limit)
+    return {"jobs": sorted(found, key=lambda job: job["created"], reverse=True)[:limit]}
 
 @app.post("/feedback")
 async def feedback(request: FeedbackRequest):
@@ -89,134 +236,33 @@ async def feedback(request: FeedbackRequest):
     return {"status": "success"}
 
 @app.get("/library")
-async def get_library():
+async def get_library(request: Request):
     """
     Returns a list of all processed chapters/books using their PDF filenames as titles.
+    Served from the in-memory catalog; clients revalidate with If-None-Match.
     """
-    processed_dir = "data/processed"
-    if not os.path.exists(processed_dir):
-        return {"subjects": []}
-    
-    library = {}
-    
-    for filename in os.listdir(processed_dir):
-        if filename.endswith(".json"):
-            file_path = os.path.join(processed_dir, filename)
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                
-                metadata = data.get("metadata", {})
-                subject = metadata.get("subject", "General")
-                grade = metadata.get("grade", "10")
-                filename_base = metadata.get("filename", filename)
-
-                # Rename Social Science subjects to specific disciplines
-                if "jess1" in filename_base or subject == "Social1":
-                    subject = "Geography"
-                elif "jess2" in filename_base or "Social-Economics" in subject:
-                    subject = "Economics"
-                elif "jess4" in filename_base or "Social-Politics" in subject:
-                    subject = "Politics"
-                elif "jess3" in filename_base:
-                    subject = "History"
-                
-                # Use the original PDF filename from metadata as the title
-                title = metadata.get("filename", filename)
-
-                if subject not in library:
-                    library[subject] = []
-                
-                library[subject].append({
-                    "id": filename,
-                    "title": title,
-                    "grade": grade,
-                    "filename": metadata.get("filename")
-                })
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-                
-    formatted_library = []
-    for subject, chapters in library.items():
-        formatted_library.append({
-            "subject": subject,
-            "chapters": chapters
-        })
-        
-    return {"subjects": formatted_library}
+    payload, etag = catalog.snapshot()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=payload, headers=headers)
 
 @app.post("/assessment")
 async def generate_assessment(request: QueryRequest):
     """
     Generates flashcards and quizzes based on a topic or subject context.
+    Repeat requests for the same chapter context are served from the artifact cache.
     """
     try:
-        # 1. Determine Namespace for retrieval
-        namespace = None
-        if request.subject and request.grade:
-            namespace = f"{request.subject}_{request.grade}".replace(" ", "_")
-        
-        # 2. Retrieve context
-        filters = {"filename": request.filename} if request.filename else None
-        docs = pipeline.vector_store.search(request.query, namespace=namespace, k=8, filter=filters)
-        
-        if not docs:
-            # Fallback: if no specific query matches, just get general subject context
-            docs = pipeline.vector_store.search(request.subject or "NCERT", namespace=namespace, k=8, filter=filters)
-            
-        if not docs:
-            raise HTTPException(status_code=404, detail="No content found to generate assessment.")
-            
-        context = "\n---\n".join([doc.page_content for doc in docs])
-        
-        # 3. Generate structured assessment
-        prompt = f"""You are an educational assessment expert for NCERT curriculum. 
-Using the context below, generate high-quality study materials for a student.
-
-Context:
-{context}
-
-Output strictly in JSON format with the following structure:
-{{
-  "topic": "The main topic name",
-  "flashcards": [
-    {{"q": "Question/Term", "a": "Concise answer/definition"}},
-    ... (at least 4)
-  ],
-  "quiz": [
-    {{
-      "q": "Multiple choice question",
-      "options": ["Option A", "Option B", "Option C", "Option D"],
-      "correct": "Exact string of the correct option"
-    }},
-    ... (at least 3)
-  ]
-}}
-
-Ensure questions are diverse and cover key concepts from the context.
-"""
-        raw_response = pipeline.generate_text(prompt)
-        
-        # Robust JSON extraction
-        import re
-        try:
-            # Match the first outer-most JSON object
-            # This regex looks for { ... } including nested braces
-            # Because simple matching is hard with nested structures, we'll try a simpler approach first:
-            # Find the first '{' and the last '}'
-            start_idx = raw_response.find('{')
-            end_idx = raw_response.rfind('}')
-            
-            if start_idx != -1 and end_idx != -1:
-                clean_json = raw_response[start_idx : end_idx + 1]
-                return json.loads(clean_json)
-            else:
-                raise ValueError("No JSON object found in response")
-        except json.JSONDecodeError:
-            # Attempt to fix common JSON errors (like trailing commas) could go here
-            # For now, let's retry logging and fall through
-            print(f"JSON Parsing Failed. Raw output:\n{raw_response}")
-            raise
+        return await run_blocking(
+            materials.assessment,
+            request.query,
+            subject=request.subject,
+            grade=request.grade,
+            filename=request.filename
+        )
+    except NoContentError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         print(f"Assessment generation error: {e}")
         # Return a fallback structure if parsing fails
@@ -227,6 +273,7 @@ Ensure questions are diverse and cover key concepts from the context.
             ],
             "quiz": []
         }
+
 @app.post("/mission")
 async def generate_mission(request: MissionRequest):
     """
@@ -258,16 +305,7 @@ async def generate_mission(request: MissionRequest):
         }}
         """
         
-        raw_response = pipeline.generate_text(prompt)
-        
-        # Clean response
-        clean_json = raw_response.strip()
-        if clean_json.startswith("```json"):
-            clean_json = clean_json.split("```json")[1].split("```")[0].strip()
-        elif clean_json.startswith("```"):
-            clean_json = clean_json.split("```")[1].split("```")[0].strip()
-            
-        return json.loads(clean_json)
+        return await run_blocking(pipeline.generate_json, prompt, MISSION_SCHEMA)
     except Exception as e:
         print(f"Mission generation error: {e}")
         return {
@@ -281,94 +319,49 @@ async def generate_mission(request: MissionRequest):
 async def generate_mindmap(request: QueryRequest):
     """
     Generates a Mermaid.js mindmap script based on a topic or chapter context.
+    Repeat requests for the same chapter context are served from the artifact cache.
     """
     try:
-        # 1. Determine Namespace
-        namespace = None
-        if request.subject and request.grade:
-            namespace = f"{request.subject}_{request.grade}".replace(" ", "_")
-        
-        # 2. Retrieve context for the mindmap
-        filters = {"filename": request.filename} if request.filename else None
-        docs = pipeline.vector_store.search(request.query, namespace=namespace, k=10, filter=filters)
-        
-        if not docs:
-            docs = pipeline.vector_store.search(request.subject or "NCERT", namespace=namespace, k=10, filter=filters)
-            
-        if not docs:
-            raise HTTPException(status_code=404, detail="No content found to generate mindmap.")
-            
-        context = "\n---\n".join([doc.page_content for doc in docs])
-        
-        # 3. Generate structured mindmap script
-        # Simplified prompt for smaller models
-        prompt = f"""Create a Mermaid.js mindmap for: {request.query}.
-        
-        Rules:
-        1. Start strictly with 'mindmap'.
-        2. Next line must be '  root(({request.query}))'.
-        3. Use indentation for branches.
-        4. No descriptions with colons (:), just short distinctive concepts.
-        5. Output ONLY the code.
-
-        Context to use:
-        {context[:500]}...
-        """
-        mindmap_script = pipeline.generate_text(prompt)
-        
-        # Clean response
-        import re
-        raw_text = mindmap_script.strip()
-        
-        # 1. Extract code block if present
-        code_block_pattern = r"```(?:mermaid)?(.*?)```"
-        match = re.search(code_block_pattern, raw_text, re.DOTALL)
-        if match:
-            raw_text = match.group(1).strip()
-        
-        # 2. Check if valid mermaid
-        if raw_text.startswith("mindmap"):
-            clean_script = raw_text
-        else:
-            # FALLBACK: Convert structured text/outline to Mindmap
-            lines = raw_text.split('\n')
-            
-            # Remove empty lines
-            lines = [l for l in lines if l.strip()]
-            
-            clean_lines = ["mindmap"]
-            # Root node
-            clean_lines.append(f'  root(("{request.query}"))')
-            
-            for line in lines:
-                stripped = line.lstrip()
-                if not stripped: continue
-                    
-                # Calculate indent level (2 spaces = 1 level approx)
-                indent_len = len(line) - len(stripped)
-                level = (indent_len // 2) + 2 # Base indent is 2
-                
-                # Sanitize content
-                # 1. Remove bullets
-                content = re.sub(r"^[-*•0-9.]+\s*", "", stripped)
-                # 2. Escape quotes and parens which break mermaid
-                content = content.replace('"', "'").replace("(", "[").replace(")", "]")
-                # 3. Limit length
-                if len(content) > 50: content = content[:47] + "..."
-                
-                if not content: continue
-                
-                # Mermaid needs at least 2 spaces indent
-                indent_str = " " * max(4, level * 2) 
-                clean_lines.append(f"{indent_str}{content}")
-                
-            clean_script = "\n".join(clean_lines)
-            
-        return {"mindmap": clean_script}
+        return await run_blocking(
+            materials.mindmap,
+            request.query,
+            subject=request.subject,
+            grade=request.grade,
+            filename=request.filename
+        )
+    except NoContentError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         print(f"MindMap generation error: {e}")
         return {"mindmap": f"mindmap\n  root((Error))\n    Failed to generate\n    {str(e)[:50]}"}
 
+@app.post("/summary")
+async def generate_summary(request: QueryRequest):
+    """
+    Revision summary of a chapter or topic (pre-generated by src/ingestion/pregenerate_materials.py).
+    """
+    try:
+        return await run_blocking(
+            materials.summary,
+            request.query,
+            subject=request.subject,
+            grade=request.grade,
+            filename=request.filename
+        )
+    except NoContentError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print(f"Summary generation error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/artifacts/warm")
+async def warm_artifacts():
+    """
+    Queues generation of the assessment and mindmap for every chapter in the library.
+    """
+    job_id = await run_blocking(warm_jobs.submit, "warm_artifacts", {})
+    return {"status": "queued", "job_id": job_id}
+
 @app.post("/visual-solve")
 async def visual_solve(
     file: UploadFile = File(...),
@@ -387,17 +380,8 @@ async def visual_solve(
             shutil.copyfileobj(file.file, buffer)
 
         # 2. Extract context using Vision (Gemini)
-        # Try to find Gemini in the pipeline
-        gemini = next((llm for llm in pipeline.llms if "GeminiLLM" in str(type(llm))), None)
-        
-        if not gemini:
-            # Fallback to OCR if Gemini Vision is not configured
-            from src.ocr.ocr_engine import OCREngine
-            ocr = OCREngine()
-            extracted_text = ocr.extract_text_from_image(file_path)
-            query = extracted_text
-            vision_analysis = "Self-extracted text via OCR."
-        else:
+        analysis_json = None
+        if any(provider.name == "GeminiLLM" for provider in pipeline.router.providers):
             # Step A: Get a descriptive analysis/extraction from Gemini Vision
             vision_prompt = """You are an NCERT AI assistant. 
             Analyze this image from a textbook or student notebook. 
@@ -412,24 +396,33 @@ async def visual_solve(
               "search_query": "Key terms for RAG search"
             }
             """
-            analysis_json = gemini.generate_from_image(vision_prompt, file_path)
-            
-            # Simple cleaning for JSON
+            # Through the router (loading Gemini if needed) for its timeout, breaker and health stats
+            try:
+                analysis_json = await run_blocking(pipeline.router.invoke, "GeminiLLM", "generate_from_image",
+                                                   vision_prompt, file_path, schema=VISUAL_ANALYSIS_SCHEMA)
+            except RuntimeError as e:
+                print(f"Vision analysis failed: {e}. Falling back to OCR...")
+
+        if analysis_json is None:
+            # Fallback to OCR if Gemini Vision is not configured or failed
+            # Reuse the ingestor's OCR engine instead of loading EasyOCR per request
+            extracted_text = await run_blocking(lambda: ocr.get().ocr_engine.extract_text_from_image(file_path))
+            query = extracted_text
+            vision_analysis = "Self-extracted text via OCR."
+        else:
             try:
-                clean_json = analysis_json.strip()
-                if clean_json.startswith("```json"): clean_json = clean_json.split("```json")[1].split("```")[0].strip()
-                elif clean_json.startswith("```"): clean_json = clean_json.split("```")[1].split("```")[0].strip()
-                analysis = json.loads(clean_json)
-                query = analysis.get("search_query", analysis.get("extracted_query", ""))
-                vision_analysis = analysis.get("visual_description", "")
-            except:
+                analysis = parse_json(analysis_json, VISUAL_ANALYSIS_SCHEMA)
+                query = analysis["search_query"] or analysis["extracted_query"]
+                vision_analysis = analysis["visual_description"]
+            except ValueError as e:
+                print(f"Vision analysis was not valid JSON: {e}")
                 query = "Problem from image"
                 vision_analysis = analysis_json
 
         # 3. Perform RAG with the extracted query
         namespace = f"{subject}_{grade}".replace(" ", "_") if subject and grade else None
-        docs = pipeline.vector_store.search(query, namespace=namespace, k=3)
-        context = "\n---\n".join([doc.page_content for doc in docs]) if docs else "No direct text context found."
+        docs = await run_blocking(pipeline.search, query, namespace=namespace, k=3)
+        context = (await run_blocking(pipeline.pack_context, docs, "visual"))[0] if docs else "No direct text context found."
 
         # 4. Generate Final Solution
         final_prompt = f"""You are an elite NCERT tutor. 
@@ -442,7 +435,7 @@ async def visual_solve(
         Provide a detailed, step-by-step solution. If it's a diagram, explain its components based on NCERT syllabus.
         """
         
-        solution = pipeline.generate_text(final_prompt)
+        solution = await run_blocking(pipeline.generate_text, final_prompt)
         
         # Cleanup
         os.remove(file_path)
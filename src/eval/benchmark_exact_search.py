@@ -0,0 +1,107 @@
+import time
+import random
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from src.ingestion.vector_store import VectorStoreManager
+from src.ingestion.vector_backends import create_backend
+from src.ingestion.local_index import LocalBackend
+from src.ingestion.exact_search import ExactSearchKernel
+
+SAMPLE_QUERIES = [
+    "What is photosynthesis?",
+    "What is a chemical reaction?",
+    "What is a quadratic equation?",
+    "Explain the rise of nationalism in Europe.",
+    "What are the sectors of the Indian economy?",
+    "What is power sharing?",
+]
+
+def sample_queries(records, n, seed=0):
+    """
+    The sample questions plus 12-word spans of random chunks from the namespace.
+    """
+    rng = random.Random(seed)
+    queries = list(SAMPLE_QUERIES)
+    for rec in rng.sample(records, min(len(records), max(n - len(queries), 0))):
+        words = rec["text"].split()
+        start = rng.randrange(max(len(words) - 12, 1))
+        queries.append(" ".join(words[start:start + 12]))
+    return queries[:n]
+
+def keys(results):
+    return {VectorStoreManager._chunk_key(doc) for doc, _ in results}
+
+def record_key(rec):
+    return VectorStoreManager._chunk_key(Document(page_content=rec["text"], metadata=rec["metadata"]))
+
+def measure(label, search, vectors, truth, k):
+    """
+    Per-query latency and recall@k of search(vector) against the exact top-k.
+    """
+    latencies, recalls = [], []
+    search(vectors[0])
+    for vector, expected in zip(vectors, truth):
+        start = time.perf_counter()
+        results = search(vector)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(keys(results) & expected) / k)
+    print(f"{label:<26} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} {np.mean(recalls):>9.3f}")
+
+def main():
+    """
+    Latency and recall@k of Pinecone, the local IVF index and the exact-search kernel on one
+    namespace. Ground truth is exact float32 search over the local index's rows, so build the
+    local index first: VECTOR_BACKEND=local python -m src.ingestion.index_data
+    """
+    parser = argparse.ArgumentParser(description="Benchmark exact local search against Pinecone.")
+    parser.add_argument("--namespace", default="Science_10", help="Namespace to query")
+    parser.add_argument("--queries", type=int, default=100, help="Number of queries")
+    parser.add_argument("-k", type=int, default=10, help="Recall@k")
+    parser.add_argument("--batch", type=int, default=64, help="Queries per query_batch() call")
+    parser.add_argument("--no-pinecone", action="store_true", help="Only benchmark the local index")
+    args = parser.parse_args()
+
+    load_dotenv()
+    manager = VectorStoreManager(backend="local")
+    local = manager.backend
+    ns = local._get(args.namespace)
+    if ns is None:
+        print(f"ERROR: No local index for namespace {args.namespace}.")
+        return
+
+    queries = sample_queries(ns.records, args.queries)
+    vectors = np.asarray(manager.embeddings.embed_documents(queries), dtype=np.float32)
+    print(f"{len(ns)} chunks in {args.namespace} ({ns.vectors.dtype}), {len(queries)} queries, k={args.k}\n")
+
+    # Ground truth: exact search over float32 copies of the stored rows
+    dense = np.asarray(ns.vectors, dtype=np.float32)
+    if ns.scales is not None:
+        dense *= ns.scales[:, None]
+    _, best = ExactSearchKernel(dense).search(vectors, args.k)
+    truth = [{record_key(ns.records[row]) for row in rows} for rows in best]
+
+    print(f"{'Search':<26} {'p50 ms':>8} {'p95 ms':>8} {'Recall@k':>9}")
+    ivf = LocalBackend(root=local.root, dimension=local.dimension, dtype=local.dtype, search="ivf")
+    exact = LocalBackend(root=local.root, dimension=local.dimension, dtype=local.dtype, search="exact")
+    measure("local IVF", lambda v: ivf.query(args.namespace, v, k=args.k), vectors, truth, args.k)
+    measure("local exact", lambda v: exact.query(args.namespace, v, k=args.k), vectors, truth, args.k)
+
+    start = time.perf_counter()
+    batched = []
+    for i in range(0, len(vectors), args.batch):
+        batched.extend(exact.query_batch(args.namespace, vectors[i:i + args.batch], k=args.k))
+    per_query = (time.perf_counter() - start) * 1000 / len(vectors)
+    recall = np.mean([len(keys(results) & expected) / args.k for results, expected in zip(batched, truth)])
+    print(f"{f'local exact, batch {args.batch}':<26} {per_query:>8.2f} {'':>8} {recall:>9.3f}  (mean per query)")
+
+    if not args.no_pinecone:
+        try:
+            pinecone = create_backend("pinecone", manager.index_name, manager.embeddings)
+            measure("pinecone", lambda v: pinecone.query(args.namespace, list(map(float, v)), k=args.k), vectors, truth, args.k)
+        except Exception as e:
+            print(f"pinecone: skipped ({e})")
+
+if __name__ == "__main__":
+    main()
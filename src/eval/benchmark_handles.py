@@ -0,0 +1,45 @@
+import time
+import argparse
+from dotenv import load_dotenv
+from langchain_pinecone import PineconeVectorStore
+from src.ingestion.vector_store import VectorStoreManager
+
+def timed(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1000
+
+def main():
+    """
+    Compares building a PineconeVectorStore per query (old behaviour) with the cached handle registry.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark per-query Pinecone handle overhead.")
+    parser.add_argument("--namespace", default="Science_10", help="Namespace to query")
+    parser.add_argument("--query", default="What is a chemical reaction?", help="Query text")
+    parser.add_argument("-n", type=int, default=20, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    load_dotenv()
+    manager = VectorStoreManager(backend="pinecone")
+    backend = manager.backend
+    vector = manager.embeddings.embed_query(args.query)
+
+    def fresh_handle():
+        return PineconeVectorStore(
+            index_name=manager.index_name,
+            embedding=manager.embeddings,
+            namespace=args.namespace
+        )
+
+    print(f"\n--- Handle construction ({args.n} runs) ---")
+    print(f"Fresh PineconeVectorStore: {timed(fresh_handle, args.n):.2f} ms")
+    print(f"Registry lookup:           {timed(lambda: backend.stores.get(args.namespace), args.n):.3f} ms")
+
+    print(f"\n--- Query by vector ({args.n} runs) ---")
+    print(f"Fresh handle per query:    {timed(lambda: fresh_handle().similarity_search_by_vector_with_score(vector, k=3), args.n):.2f} ms")
+    print(f"Cached handle:             {timed(lambda: backend.query(args.namespace, vector, k=3), args.n):.2f} ms")
+    print(f"\nRegistry: {backend.stores.created} created, {backend.stores.reused} reused")
+
+if __name__ == "__main__":
+    main()
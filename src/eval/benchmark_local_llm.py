@@ -0,0 +1,59 @@
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from src.rag.local_llm import LocalLLM
+
+PROMPTS = [
+    "What is photosynthesis?",
+    "What is a chemical reaction?",
+    "Explain the rise of nationalism in Europe.",
+    "What are the sectors of the Indian economy?",
+    "What is a quadratic equation?",
+    "What is power sharing?",
+    "Explain Newton's laws of motion.",
+    "What is the water cycle?",
+]
+
+def run(llm, concurrency, requests, max_new_tokens):
+    prompts = [PROMPTS[i % len(PROMPTS)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outputs = list(pool.map(lambda p: llm.generate(p, max_new_tokens=max_new_tokens), prompts))
+    elapsed = time.perf_counter() - start
+    tokens = sum(len(llm.tokenizer(text)["input_ids"]) for text in outputs)
+    return tokens, elapsed
+
+def main():
+    """
+    Generated tokens per second for the local LLM engines under concurrent load.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark LocalLLM throughput.")
+    parser.add_argument("--model-dir", default="models/llm_ov", help="OpenVINO export (with KV cache)")
+    parser.add_argument("--legacy-dir", default=None, help="Optional export made without KV cache")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent requests")
+    parser.add_argument("--requests", type=int, default=8, help="Total requests per configuration")
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    args = parser.parse_args()
+
+    configs = [("pipeline, KV cache", dict(model_dir=args.model_dir, engine="pipeline", use_cache=True)),
+               ("batched, KV cache", dict(model_dir=args.model_dir, engine="batched", use_cache=True,
+                                          max_batch=args.concurrency))]
+    if args.legacy_dir:
+        configs.insert(0, ("pipeline, no cache", dict(model_dir=args.legacy_dir, engine="pipeline", use_cache=False)))
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.max_new_tokens} max new tokens\n")
+    print(f"{'Engine':<22} {'Tokens':>8} {'Seconds':>9} {'Tokens/s':>9}")
+    for label, options in configs:
+        llm = LocalLLM(**options)
+        if llm.model is None:
+            print(f"{label:<22} model not found")
+            continue
+        # Warm-up compiles the model and fills caches
+        llm.generate(PROMPTS[0], max_new_tokens=8)
+        tokens, elapsed = run(llm, args.concurrency, args.requests, args.max_new_tokens)
+        print(f"{label:<22} {tokens:>8} {elapsed:>9.1f} {tokens / elapsed:>9.1f}")
+        if llm.scheduler:
+            print(f"  scheduler: {llm.scheduler.stats()}")
+
+if __name__ == "__main__":
+    main()
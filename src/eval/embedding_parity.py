@@ -0,0 +1,82 @@
+import os
+import random
+import argparse
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.ingestion.embedding_models import load_embeddings, DEFAULT_EMBEDDING_MODEL
+from src.ingestion.processed_store import list_processed, iter_pages
+
+SAMPLE_QUERIES = [
+    "What is photosynthesis?",
+    "What is a chemical reaction?",
+    "What is a quadratic equation?",
+    "Explain the rise of nationalism in Europe.",
+    "What are the sectors of the Indian economy?",
+    "What is power sharing?",
+    "प्रकाश संश्लेषण क्या है?",
+]
+
+def load_chunks(processed_dir, limit, seed=0):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    chunks = []
+    for file in list_processed(processed_dir):
+        try:
+            for page in iter_pages(os.path.join(processed_dir, file)):
+                chunks.extend(splitter.split_text(page["content"]))
+        except Exception as e:
+            print(f"Skipping {file}: {e}")
+    random.Random(seed).shuffle(chunks)
+    return chunks[:limit]
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9, None)
+
+def main():
+    """
+    Recall-parity check between the fp32 PyTorch encoder and a quantized OpenVINO export.
+    """
+    parser = argparse.ArgumentParser(description="Compare fp32 and quantized embedding models.")
+    parser.add_argument("--reference", default=DEFAULT_EMBEDDING_MODEL, help="fp32 model")
+    parser.add_argument("--candidate", default="openvino:models/embedding_ov", help="Quantized model spec")
+    parser.add_argument("--dir", default="data/processed", help="Processed JSON directory")
+    parser.add_argument("--chunks", type=int, default=2000, help="Number of corpus chunks to embed")
+    parser.add_argument("-k", type=int, default=10, help="Recall@k")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Fail below this recall")
+    args = parser.parse_args()
+
+    corpus = load_chunks(args.dir, args.chunks)
+    if not corpus:
+        print("ERROR: No chunks found to compare.")
+        return
+    # Queries: fixed questions plus the opening of some corpus chunks
+    queries = SAMPLE_QUERIES + [chunk[:120] for chunk in corpus[:50]]
+    print(f"Corpus: {len(corpus)} chunks, {len(queries)} queries")
+
+    results = {}
+    for name, spec in (("reference", args.reference), ("candidate", args.candidate)):
+        model = load_embeddings(spec)
+        results[name] = (
+            normalize(model.embed_documents(corpus)),
+            normalize([model.embed_query(q) for q in queries])
+        )
+
+    ref_docs, ref_queries = results["reference"]
+    cand_docs, cand_queries = results["candidate"]
+
+    cosine = (ref_docs * cand_docs).sum(axis=1)
+    k = min(args.k, len(corpus))
+    ref_top = np.argsort(-(ref_queries @ ref_docs.T), axis=1)[:, :k]
+    cand_top = np.argsort(-(cand_queries @ cand_docs.T), axis=1)[:, :k]
+    recall = np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)])
+
+    print("\n--- Embedding Parity ---")
+    print(f"Vector cosine (fp32 vs candidate): mean {cosine.mean():.4f}, min {cosine.min():.4f}")
+    print(f"Recall@{k} vs fp32 neighbours: {recall:.4f}")
+    if recall < args.min_recall:
+        print(f"FAIL: recall below {args.min_recall}")
+        raise SystemExit(1)
+    print("PASS")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import time
+import argparse
+import statistics
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+QUERIES = [
+    "What is photosynthesis?",
+    "What is a chemical reaction?",
+    "Explain the rise of nationalism in Europe.",
+    "What are the sectors of the Indian economy?",
+    "What is a quadratic equation?",
+]
+
+def one_request(url, i, grade, subject, stream=False):
+    """
+    Returns (ok, latency, ttft). For SSE endpoints ttft is the time until the first token event.
+    """
+    payload = {"query": QUERIES[i % len(QUERIES)], "grade": grade, "subject": subject}
+    start = time.perf_counter()
+    ttft = None
+    try:
+        response = requests.post(url, json=payload, timeout=300, stream=stream)
+        ok = response.status_code == 200
+        if stream and ok:
+            for line in response.iter_lines(decode_unicode=True):
+                if ttft is None and line == "event: token":
+                    ttft = time.perf_counter() - start
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - start, ttft
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def run_level(url, users, requests_per_user, grade, subject, stream=False):
+    total = users * requests_per_user
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        results = list(pool.map(lambda i: one_request(url, i, grade, subject, stream), range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for ok, latency, _ in results if ok)
+    ttfts = sorted(ttft for ok, _, ttft in results if ok and ttft is not None)
+    errors = sum(1 for ok, _, _ in results if not ok)
+    if not latencies:
+        print(f"{users:>5} users: all {total} requests failed")
+        return
+    line = (f"{users:>5} users: {len(latencies) / elapsed:6.2f} req/s | "
+            f"p50 {statistics.median(latencies):6.2f}s | p95 {percentile(latencies, 0.95):6.2f}s | errors {errors}")
+    if ttfts:
+        line += f" | TTFT p50 {statistics.median(ttfts):6.2f}s p95 {percentile(ttfts, 0.95):6.2f}s"
+    print(line)
+
+def main():
+    """
+    Load test for the API: throughput should scale with concurrent users instead of staying flat.
+    """
+    parser = argparse.ArgumentParser(description="Concurrent-user load test for /chat and /chat/stream.")
+    parser.add_argument("--url", default="http://localhost:8000/chat")
+    parser.add_argument("--users", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=4, help="Requests per user per level")
+    parser.add_argument("--grade", default="10")
+    parser.add_argument("--subject", default="Science")
+    parser.add_argument("--stream", action="store_true", help="Target is an SSE endpoint (e.g. /chat/stream); also report TTFT")
+    args = parser.parse_args()
+
+    print(f"Load testing {args.url}")
+    for users in [int(u) for u in args.users.split(",")]:
+        run_level(args.url, users, args.requests, args.grade, args.subject, stream=args.stream)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class QueryEmbeddingCache:
+    """
+    Size- and TTL-bounded LRU of query embeddings, keyed by whitespace-normalized text.
+    Case is kept: the encoder's tokenizer is cased, so "DNA" and "dna" embed differently.
+
+    Misses that arrive within `batch_window` seconds of each other are encoded together:
+    the first caller waits out the window, then embeds every pending query in one call
+    while the others block on their Future.
+    """
+    def __init__(self, embeddings, max_size=4096, ttl=3600, batch_window=0.005, max_batch=64):
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self.ttl = ttl
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        self._cache = OrderedDict()
+        self._pending = OrderedDict()
+        self._leader_active = False
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.encoded = 0
+
+    @staticmethod
+    def normalize(text):
+        """
+        Collapses whitespace (this is both the cache key and the text that is embedded).
+        """
+        return " ".join(str(text).split())
+
+    def embed_query(self, text):
+        key = text = self.normalize(text)
+        leader = False
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            self.misses += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = (text, Future())
+                self._pending[key] = pending
+            if not self._leader_active:
+                self._leader_active = True
+                leader = True
+
+        if leader:
+            self._run_batch()
+        return pending[1].result()
+
+    def _run_batch(self):
+        time.sleep(self.batch_window)
+        with self._lock:
+            batch = list(self._pending.items())
+            self._pending.clear()
+            self._leader_active = False
+
+        for start in range(0, len(batch), self.max_batch):
+            part = batch[start:start + self.max_batch]
+            try:
+                vectors = self.embeddings.embed_documents([text for _, (text, _) in part])
+            except Exception as e:
+                for _, (_, future) in part:
+                    future.set_exception(e)
+                continue
+
+            now = time.monotonic()
+            with self._lock:
+                self.batches += 1
+                self.encoded += len(part)
+                for (key, _), vector in zip(part, vectors):
+                    self._cache[key] = (vector, now)
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+
+            for (_, (_, future)), vector in zip(part, vectors):
+                future.set_result(vector)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "batches": self.batches,
+                "encoded": self.encoded
+            }
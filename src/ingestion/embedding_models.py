@@ -0,0 +1,65 @@
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+
+class OpenVINOEmbeddings(Embeddings):
+    """
+    Sentence embeddings from an OpenVINO export of the MiniLM encoder
+    (see src/ingestion/export_embedding_model.py). Uses the same mean pooling
+    as sentence-transformers so vectors stay compatible with the fp32 index.
+    """
+    def __init__(self, model_dir="models/embedding_ov", batch_size=32, max_length=128):
+        from optimum.intel import OVModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        model_xml = os.path.join(model_dir, "openvino_model.xml")
+        if not os.path.exists(model_xml):
+            raise FileNotFoundError(
+                f"OpenVINO embedding model not found at {model_xml}. "
+                "Run 'python -m src.ingestion.export_embedding_model' first."
+            )
+        print(f"Loading OpenVINO embedding model from {model_dir}...")
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = OVModelForFeatureExtraction.from_pretrained(model_dir, compile=True)
+
+    def _encode(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            inputs = self.tokenizer(
+                batch, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+            )
+            hidden = np.asarray(self.model(**inputs).last_hidden_state)
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            vectors.extend(pooled.tolist())
+        return vectors
+
+    def embed_documents(self, texts):
+        return self._encode([text.replace("\n", " ") for text in texts])
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def load_embeddings(embedding_model=None):
+    """
+    Resolves an embedding model spec:
+      - "openvino:<dir>" or a directory holding openvino_model.xml -> OpenVINOEmbeddings
+      - anything else -> HuggingFaceEmbeddings (PyTorch)
+    Falls back to the EMBEDDING_MODEL env var, then the default MiniLM model.
+    """
+    embedding_model = embedding_model or os.getenv("EMBEDDING_MODEL") or DEFAULT_EMBEDDING_MODEL
+    if embedding_model.startswith("openvino:"):
+        return OpenVINOEmbeddings(embedding_model.split(":", 1)[1])
+    if os.path.exists(os.path.join(embedding_model, "openvino_model.xml")):
+        return OpenVINOEmbeddings(embedding_model)
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=embedding_model)
@@ -0,0 +1,107 @@
+import numpy as np
+
+
+def row_norms(vectors, scales=None, block_rows=4096):
+    """
+    L2 norms of the stored rows as they will be scored (after int8/float16 rounding), in blocks.
+    """
+    norms = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+        norms[start:start + len(block)] = np.linalg.norm(block, axis=1)
+    if scales is not None:
+        norms *= scales
+    norms[norms == 0] = 1.0
+    return norms
+
+
+class ExactSearchKernel:
+    """
+    Brute-force cosine top-k over one embedding matrix (float32, float16 or int8 with
+    per-row scales; typically a memory map).
+
+    Queries are scored in one matrix product per block of `block_rows` rows, converted to
+    float32 block by block so BLAS does the work and memory stays bounded. Every score is
+    divided by the row's precomputed norm, so quantized rows give true cosines. Top-k per
+    query uses argpartition, merged across blocks.
+
+    int8 converts about as fast as float32 is read; numpy's float16 conversion is slower, so
+    float16 trades query time for memory. Batching queries amortizes the conversion.
+    """
+    def __init__(self, vectors, scales=None, norms=None, block_rows=4096):
+        self.vectors = vectors
+        self.block_rows = block_rows
+        self.norms = norms if norms is not None else row_norms(vectors, scales, block_rows)
+        # Per-row factor applied to raw dot products: dequantization scale / norm
+        self.weights = (scales / self.norms if scales is not None else 1.0 / self.norms).astype(np.float32)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @staticmethod
+    def _top_k(scores, k):
+        """
+        Column indices of the k best scores per row, best first.
+        """
+        k = min(k, scores.shape[1])
+        if k < scores.shape[1]:
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            best = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1)
+        return np.take_along_axis(best, order, axis=1)
+
+    def _block(self, rows, start, end):
+        if rows is None:
+            return np.asarray(self.vectors[start:end], dtype=np.float32), self.weights[start:end]
+        if isinstance(rows, slice):
+            lo, hi = rows.start + start, rows.start + end
+            return np.asarray(self.vectors[lo:hi], dtype=np.float32), self.weights[lo:hi]
+        part = rows[start:end]
+        return np.asarray(self.vectors[part], dtype=np.float32), self.weights[part]
+
+    def search(self, queries, k=3, rows=None):
+        """
+        Top-k for every query (Q, d), optionally restricted to `rows` (a slice or an index
+        array). Returns (scores, row indices), both (Q, min(k, candidates)), best first.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        if rows is None:
+            n = len(self.vectors)
+        elif isinstance(rows, slice):
+            n = rows.stop - rows.start
+        else:
+            n = len(rows)
+        k = min(k, n)
+        if not k:
+            return np.zeros((len(queries), 0), dtype=np.float32), np.zeros((len(queries), 0), dtype=np.int64)
+
+        best_scores = best_rows = None
+        for start in range(0, n, self.block_rows):
+            end = min(start + self.block_rows, n)
+            block, weights = self._block(rows, start, end)
+            scores = (queries @ block.T) * weights
+            top = self._top_k(scores, k)
+            scores = np.take_along_axis(scores, top, axis=1)
+            positions = top + start
+            if best_scores is not None:
+                # Merge with the best of the previous blocks
+                scores = np.concatenate([best_scores, scores], axis=1)
+                positions = np.concatenate([best_rows, positions], axis=1)
+                top = self._top_k(scores, k)
+                scores = np.take_along_axis(scores, top, axis=1)
+                positions = np.take_along_axis(positions, top, axis=1)
+            best_scores, best_rows = scores, positions
+
+        # Positions within `rows` -> matrix rows
+        if isinstance(rows, slice):
+            best_rows = best_rows + rows.start
+        elif rows is not None:
+            best_rows = np.asarray(rows)[best_rows]
+        return best_scores, best_rows
@@ -0,0 +1,34 @@
+from optimum.intel import OVModelForFeatureExtraction, OVWeightQuantizationConfig
+from transformers import AutoTokenizer
+import os
+
+def export_embedding_model(model_id="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", save_dir="models/embedding_ov", bits=8):
+    print(f"Exporting {model_id} to OpenVINO format (INT{bits} weights)...")
+
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    print("Saving tokenizer...")
+    tokenizer.save_pretrained(save_dir)
+
+    print("Exporting and quantizing encoder...")
+    model = OVModelForFeatureExtraction.from_pretrained(
+        model_id,
+        export=True,
+        quantization_config=OVWeightQuantizationConfig(bits=bits) if bits < 16 else None
+    )
+    print("Saving OpenVINO model...")
+    model.save_pretrained(save_dir)
+
+    print(f"Embedding model successfully exported to {save_dir}")
+    print(f"Use it with EMBEDDING_MODEL=openvino:{save_dir}, then run 'python -m src.eval.embedding_parity' to check recall.")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Export the MiniLM embedding encoder to OpenVINO.")
+    parser.add_argument("--model", default="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("--out", default="models/embedding_ov")
+    parser.add_argument("--bits", type=int, default=8, help="Weight precision (8 = INT8, 16 = keep FP)")
+    args = parser.parse_args()
+    export_embedding_model(args.model, args.out, args.bits)
@@ -6,6 +6,11 @@ def main():
     parser = argparse.ArgumentParser(description="Index processed NCERT JSON files into Pinecone.")
     parser.add_argument("--dir", default="data/processed", help="Directory containing processed JSON files")
     parser.add_argument("--index", default=None, help="Pinecone index name")
+    parser.add_argument("--full", action="store_true", help="Re-embed every chunk instead of only new/changed ones")
+    parser.add_argument("--workers", type=int, default=None, help="Chunking worker processes (default: CPUs - 1)")
+    parser.add_argument("--embed-batch", type=int, default=256, help="Chunks per embedding batch (across files)")
+    parser.add_argument("--upsert-batch", type=int, default=100, help="Vectors per upsert request")
+    parser.add_argument("--upsert-workers", type=int, default=4, help="Concurrent upsert threads")
     args = parser.parse_args()
 
     # Initialize the VectorStoreManager
@@ -13,8 +18,15 @@ def main():
     try:
         manager = VectorStoreManager(index_name=args.index)
         print(f"Starting indexing from: {args.dir}")
-        manager.index_processed_files(processed_dir=args.dir)
-        print("\nSUCCESS: All files indexed into Pinecone.")
+        manager.index_processed_files(
+            processed_dir=args.dir,
+            full=args.full,
+            chunk_workers=args.workers,
+            embed_batch=args.embed_batch,
+            upsert_batch=args.upsert_batch,
+            upsert_workers=args.upsert_workers
+        )
+        print("\nSUCCESS: All files indexed.")
     except Exception as e:
         print(f"\nERROR: Could not complete indexing: {e}")
 
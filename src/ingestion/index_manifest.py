@@ -0,0 +1,101 @@
+import os
+import json
+import hashlib
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_id(source, page, offset):
+    """
+    Deterministic chunk ID derived from the processed file, page number and character offset,
+    so re-indexing overwrites vectors instead of duplicating them.
+    """
+    return hashlib.sha1(f"{source}|{page}|{offset}".encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """
+    Local record of what is already in the index:
+
+        {"generation": 3,
+         "files": {"10_Science_jesc101.pdf.json": {"sha256": ..., "namespace": "Science_10",
+                                                     "filename": "jesc101.pdf",
+                                                     "chunks": {chunk_id: content_hash}}}}
+
+    `generation` increases whenever indexed content changes, so caches can detect re-indexing.
+    version() fingerprints just the files behind one namespace/filename, for caches that
+    should only be invalidated when their own sources change.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.data = {"generation": 0, "files": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+            self.data.setdefault("generation", 0)
+            self.data.setdefault("files", {})
+        self.dirty = False
+
+    @property
+    def generation(self):
+        return self.data["generation"]
+
+    def files(self):
+        return list(self.data["files"].keys())
+
+    def get(self, file):
+        return self.data["files"].get(file)
+
+    def set(self, file, sha256, namespace, chunks, filename=None):
+        self.data["files"][file] = {"sha256": sha256, "namespace": namespace, "filename": filename, "chunks": chunks}
+        self.dirty = True
+
+    def set_filename(self, file, filename):
+        """
+        Records the source filename (chunk metadata "filename") of an entry indexed before it was stored.
+        """
+        self.data["files"][file]["filename"] = filename
+        self.dirty = True
+
+    def version(self, namespace=None, filename=None):
+        """
+        Fingerprint of the indexed files in `namespace` whose source filename is `filename`
+        (None matches all). Entries without a recorded filename count for every filename.
+        """
+        digest = hashlib.sha1()
+        for file in sorted(self.data["files"]):
+            entry = self.data["files"][file]
+            if namespace and entry["namespace"] != namespace:
+                continue
+            if filename and entry.get("filename", filename) not in (filename, None):
+                continue
+            digest.update(f"{file}|{entry['sha256']}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def remove(self, file):
+        self.data["files"].pop(file, None)
+        self.dirty = True
+
+    def bump(self):
+        self.data["generation"] += 1
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
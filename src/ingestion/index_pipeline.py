@@ -0,0 +1,315 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from src.ingestion.index_manifest import file_sha256, content_hash, chunk_id
+from src.ingestion.processed_store import list_processed, read_metadata, iter_pages
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+SEPARATORS = ["\n\n", "\n", ".", " ", ""]
+
+_worker_splitter = None
+
+
+def make_text_splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=SEPARATORS,
+        add_start_index=True
+    )
+
+
+def namespace_for(metadata):
+    subject = metadata.get("subject", "General")
+    grade = metadata.get("grade", "General")
+    return f"{subject}_{grade}".replace(" ", "_")
+
+
+def chunk_file(file_path):
+    """
+    Reads and chunks one processed file. Runs in a worker process.
+    Returns (file, sha256, namespace, [(chunk_id, Document, content_hash), ...]).
+    """
+    global _worker_splitter
+    if _worker_splitter is None:
+        _worker_splitter = make_text_splitter()
+
+    file = os.path.basename(file_path)
+    sha256 = file_sha256(file_path)
+    metadata = read_metadata(file_path)
+
+    # Pages are read and split one at a time, but all of the file's chunks are returned
+    # together, so memory per file grows with the book (bounded by _chunk_results' window)
+    chunks = []
+    for page in iter_pages(file_path):
+        doc_metadata = metadata.copy()
+        doc_metadata["page"] = page["page_number"]
+        doc_metadata["extraction_type"] = page["type"]
+        document = Document(page_content=page["content"], metadata=doc_metadata)
+        for chunk in _worker_splitter.split_documents([document]):
+            cid = chunk_id(file, chunk.metadata["page"], chunk.metadata["start_index"])
+            chunks.append((cid, chunk, content_hash(chunk.page_content)))
+    return file, sha256, namespace_for(metadata), chunks
+
+
+class IndexingPipeline:
+    """
+    Streaming bulk indexer:
+
+        worker processes  -> chunk changed files
+        main thread       -> embed chunks in large cross-file batches
+        upsert threads    -> write fixed-size vector batches (bounded queue, retries)
+
+    A file is recorded in the manifest only after all of its upserts and deletes succeed,
+    so an interrupted or partially failed run is picked up again next time.
+
+    Every successful upsert/delete is mirrored into the manager's BM25 keyword index.
+    Unchanged files that the keyword index does not know yet (indexed before it existed)
+    are chunked and added to it without re-embedding.
+    """
+    def __init__(self, manager, chunk_workers=None, embed_batch=256, upsert_batch=100,
+                 upsert_workers=4, queue_size=16, max_retries=3, report_every=10.0):
+        self.manager = manager
+        self.backend = manager.backend
+        self.keyword_index = manager.keyword_index
+        self.chunk_workers = chunk_workers if chunk_workers is not None else max(1, (os.cpu_count() or 2) - 1)
+        self.embed_batch = embed_batch
+        self.upsert_batch = upsert_batch
+        self.upsert_workers = upsert_workers
+        self.max_retries = max_retries
+        self.report_every = report_every
+
+        self._tasks = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._failed = set()
+        self._stats = {"files": 0, "skipped": 0, "chunks": 0, "upserted": 0, "deleted": 0, "retries": 0, "keyword_backfilled": 0}
+
+    def run(self, processed_dir="data/processed", full=False):
+        self._started = time.perf_counter()
+        self._last_report = self._started
+        manifest = self.manager.manifest()
+        self._manifest = manifest
+
+        # Only completed books; ingestions still in progress are picked up on a later run
+        files = list_processed(processed_dir)
+        keyword_files = self.keyword_index.files()
+        changed = []
+        backfill = set()
+        for file in files:
+            entry = manifest.get(file)
+            if entry and not full and entry["sha256"] == file_sha256(os.path.join(processed_dir, file)):
+                self._stats["skipped"] += 1
+                if "filename" not in entry:
+                    manifest.set_filename(file, read_metadata(os.path.join(processed_dir, file)).get("filename"))
+                if file not in keyword_files:
+                    backfill.add(os.path.join(processed_dir, file))
+            else:
+                changed.append(os.path.join(processed_dir, file))
+
+        print(f"Indexing {len(changed)} changed files ({self._stats['skipped']} unchanged, "
+              f"{len(backfill)} to add to the keyword index) with {self.chunk_workers} chunk workers, {self.upsert_workers} upsert workers")
+
+        threads = [threading.Thread(target=self._upsert_worker, daemon=True) for _ in range(self.upsert_workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            # Files that were indexed before but no longer exist
+            for file in manifest.files():
+                if file not in files:
+                    entry = manifest.get(file)
+                    print(f"Removing deleted file: {file}")
+                    self._begin_file(file, None)
+                    self._submit_deletes(file, entry["namespace"], list(entry["chunks"]))
+                    self._finish_file(file)
+
+            buffer = []
+            for path, result in zip(changed + sorted(backfill), self._chunk_results(changed + sorted(backfill))):
+                if path in backfill:
+                    self._backfill_keywords(result)
+                    continue
+                buffer.extend(self._plan_file(result, full))
+                while len(buffer) >= self.embed_batch:
+                    self._embed_and_submit(buffer[:self.embed_batch])
+                    buffer = buffer[self.embed_batch:]
+                self._report()
+            if buffer:
+                self._embed_and_submit(buffer)
+        finally:
+            for _ in threads:
+                self._tasks.put(None)
+            for thread in threads:
+                thread.join()
+
+        with self._lock:
+            if self._stats["files"] or self._stats["keyword_backfilled"]:
+                manifest.bump()
+            self.manager._commit(manifest)
+        self._report(final=True)
+        if self._failed:
+            print(f"WARNING: {len(self._failed)} files failed and will be retried next run: {sorted(self._failed)}")
+        return dict(self._stats)
+
+    def _chunk_results(self, paths):
+        if self.chunk_workers <= 1 or len(paths) <= 1:
+            for path in paths:
+                yield self._safe_chunk(path)
+            return
+        # At most chunk_workers * 2 files in flight, so finished chunks never pile up in memory
+        # while embedding falls behind; the next file is submitted as each result is consumed
+        pending = iter(paths)
+        # spawn, not fork: /upload jobs index inside the API server, whose threads and
+        # torch/OpenMP runtime a forked child would inherit in an arbitrary state
+        with ProcessPoolExecutor(max_workers=self.chunk_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = deque((path, pool.submit(chunk_file, path)) for path in islice(pending, self.chunk_workers * 2))
+            while futures:
+                path, future = futures.popleft()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  ERROR chunking {os.path.basename(path)}: {e}")
+                    result = None
+                for path in islice(pending, 1):
+                    futures.append((path, pool.submit(chunk_file, path)))
+                yield result
+
+    def _safe_chunk(self, path):
+        try:
+            return chunk_file(path)
+        except Exception as e:
+            print(f"  ERROR chunking {os.path.basename(path)}: {e}")
+            return None
+
+    def _plan_file(self, result, full):
+        """
+        Diffs a chunked file against the manifest. Returns the chunks that need embedding.
+        """
+        if result is None:
+            return []
+        file, sha256, namespace, chunks = result
+        entry = self._manifest.get(file)
+        hashes = {cid: digest for cid, _, digest in chunks}
+
+        previous = entry["chunks"] if entry and entry["namespace"] == namespace else {}
+        known = {} if full else previous
+        todo = [(file, namespace, cid, chunk) for cid, chunk, digest in chunks if known.get(cid) != digest]
+        stale = [cid for cid in previous if cid not in hashes]
+
+        filename = chunks[0][1].metadata.get("filename") if chunks else None
+        self._begin_file(file, (sha256, namespace, hashes, filename))
+        if entry and entry["namespace"] != namespace:
+            self._submit_deletes(file, entry["namespace"], list(entry["chunks"]))
+        if stale:
+            self._submit_deletes(file, namespace, stale)
+        with self._lock:
+            self._pending[file]["outstanding"] += len(todo)
+            self._stats["chunks"] += len(chunks)
+        self._finish_file(file)
+        return todo
+
+    def _backfill_keywords(self, result):
+        if result is None:
+            return
+        file, _, namespace, chunks = result
+        self.keyword_index.upsert(namespace, [cid for cid, _, _ in chunks], [chunk for _, chunk, _ in chunks])
+        self.keyword_index.mark_file(file, namespace)
+        with self._lock:
+            self._stats["keyword_backfilled"] += 1
+
+    def _begin_file(self, file, entry):
+        with self._lock:
+            # Holds one extra reference until planning is done so the file cannot complete early
+            self._pending[file] = {"outstanding": 1, "entry": entry}
+
+    def _finish_file(self, file, count=1, failed=False):
+        with self._lock:
+            state = self._pending.get(file)
+            if state is None:
+                return
+            if failed:
+                self._failed.add(file)
+            state["outstanding"] -= count
+            if state["outstanding"] > 0:
+                return
+            del self._pending[file]
+            if file in self._failed:
+                return
+            if state["entry"] is None:
+                self._manifest.remove(file)
+                self.keyword_index.forget_file(file)
+            else:
+                sha256, namespace, hashes, filename = state["entry"]
+                self._manifest.set(file, sha256, namespace, hashes, filename=filename)
+                self.keyword_index.mark_file(file, namespace)
+            self._stats["files"] += 1
+
+    def _submit_deletes(self, file, namespace, ids):
+        with self._lock:
+            self._pending[file]["outstanding"] += 1
+        self._tasks.put(("delete", file, namespace, ids))
+
+    def _embed_and_submit(self, batch):
+        vectors = self.manager.embeddings.embed_documents([chunk.page_content for _, _, _, chunk in batch])
+        # Group by (file, namespace) so each upsert batch completes exactly one file's chunks
+        groups = {}
+        for item, vector in zip(batch, vectors):
+            groups.setdefault((item[0], item[1]), []).append((item[2], vector, item[3]))
+        for (file, namespace), items in groups.items():
+            for start in range(0, len(items), self.upsert_batch):
+                self._tasks.put(("upsert", file, namespace, items[start:start + self.upsert_batch]))
+
+    def _upsert_worker(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            kind, file, namespace, payload = task
+            ok = self._with_retries(kind, namespace, payload)
+            with self._lock:
+                if ok and kind == "upsert":
+                    self._stats["upserted"] += len(payload)
+                elif ok:
+                    self._stats["deleted"] += len(payload)
+            self._finish_file(file, count=len(payload) if kind == "upsert" else 1, failed=not ok)
+
+    def _with_retries(self, kind, namespace, payload):
+        for attempt in range(self.max_retries + 1):
+            try:
+                if kind == "upsert":
+                    ids = [cid for cid, _, _ in payload]
+                    documents = [chunk for _, _, chunk in payload]
+                    self.backend.upsert(namespace, ids, [vector for _, vector, _ in payload], documents)
+                    self.keyword_index.upsert(namespace, ids, documents)
+                else:
+                    self.backend.delete(namespace, payload)
+                    self.keyword_index.delete(namespace, payload)
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"  ERROR: {kind} of {len(payload)} vectors in {namespace} failed: {e}")
+                    return False
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(0.5 * 2 ** attempt)
+
+    def _report(self, final=False):
+        now = time.perf_counter()
+        if not final and now - self._last_report < self.report_every:
+            return
+        self._last_report = now
+        elapsed = max(now - self._started, 1e-9)
+        with self._lock:
+            stats = dict(self._stats)
+        label = "Indexing complete" if final else "  Progress"
+        print(f"{label}: {stats['files']} files, {stats['chunks']} chunks ({stats['chunks'] / elapsed:.1f} chunks/s), "
+              f"{stats['upserted']} vectors upserted ({stats['upserted'] / elapsed:.1f} vectors/s), "
+              f"{stats['deleted']} deleted, {stats['retries']} retries, {elapsed:.1f}s")
@@ -1,16 +1,19 @@
 import os
-import json
 import argparse
 from src.ocr.ocr_engine import OCREngine
+from src.ingestion.processed_store import ProcessedWriter
+from src.ingestion.library_catalog import LibraryCatalog
 
 class DataIngestor:
-    def __init__(self, raw_dir="data/raw", processed_dir="data/processed"):
+    def __init__(self, raw_dir="data/raw", processed_dir="data/processed", ocr_workers=None):
         self.raw_dir = raw_dir
         self.processed_dir = processed_dir
-        self.ocr_engine = OCREngine()
+        self.ocr_engine = OCREngine(workers=ocr_workers)
         
         if not os.path.exists(self.processed_dir):
             os.makedirs(self.processed_dir)
+        # Completed books are added to the /library catalog as they finish
+        self.catalog = LibraryCatalog(processed_dir=self.processed_dir)
 
     def ingest_all(self):
         """
@@ -23,9 +26,11 @@ class DataIngestor:
                     raw_path = os.path.join(root, file)
                     self.ingest_file(raw_path)
 
-    def ingest_file(self, file_path):
+    def ingest_file(self, file_path, progress=None, raise_errors=False):
         """
         Extract text from a single file and save metadata.
+        `progress(pages_done, total_pages)` is called after every page.
+        Returns the processed file path, or None if ingestion failed (unless `raise_errors`).
         """
         print(f"\n--- Starting Ingestion: {file_path} ---")
         
@@ -51,25 +56,45 @@ class DataIngestor:
         print(f"Metadata identified: Grade {metadata['grade']}, Subject {metadata['subject']}")
 
         try:
-            pages = self.ocr_engine.extract_text_from_pdf(file_path)
-            
-            # Save processed data
-            output_filename = f"{metadata['grade']}_{metadata['subject']}_{metadata['filename']}.json".replace(" ", "_")
+            # Stream pages to JSONL so a crash keeps finished pages and memory stays flat
+            output_filename = f"{metadata['grade']}_{metadata['subject']}_{metadata['filename']}.jsonl".replace(" ", "_")
             output_path = os.path.join(self.processed_dir, output_filename)
-            
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump({"metadata": metadata, "pages": pages}, f, indent=4, ensure_ascii=False)
-            
-            print(f"DONE: Successfully saved {len(pages)} pages to {output_path}")
+
+            writer = ProcessedWriter(output_path, metadata)
+            if writer.pages_written:
+                print(f"Resuming {output_path} after page {writer.pages_written}")
+            total_pages = self.ocr_engine.count_pages(file_path)
+            try:
+                for page in self.ocr_engine.iter_pages(file_path, start_page=writer.pages_written):
+                    writer.write_page(page)
+                    if progress:
+                        progress(writer.pages_written, total_pages)
+                writer.complete()
+            finally:
+                writer.close()
+
+            # Superseded whole-book JSON from the old format
+            legacy_path = output_path[:-len(".jsonl")] + ".json"
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+                self.catalog.remove(os.path.basename(legacy_path))
+            self.catalog.update(output_filename)
+
+            print(f"DONE: Successfully saved {writer.pages_written} pages to {output_path}")
+            return output_path
         except Exception as e:
             print(f"ABORTED: Error processing {file_path}: {e}")
+            if raise_errors:
+                raise
+            return None
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest NCERT books.")
     parser.add_argument("--file", help="Path to a specific file to ingest")
+    parser.add_argument("--workers", type=int, default=None, help="OCR worker processes (default: OCR_WORKERS or 1)")
     args = parser.parse_args()
 
-    ingestor = DataIngestor()
+    ingestor = DataIngestor(ocr_workers=args.workers)
     if args.file:
         ingestor.ingest_file(args.file)
     else:
@@ -0,0 +1,240 @@
+import os
+import re
+import json
+import shutil
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from src.ingestion.local_index import matches_filter
+
+# Latin/digit words plus Devanagari runs (vowel signs are not \w, so they are listed explicitly)
+TOKEN_PATTERN = re.compile(r"[\wऀ-ॿ]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of",
+    "on", "or", "that", "the", "this", "to", "was", "what", "which", "with", "how", "why"
+}
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class _KeywordNamespace:
+    """
+    In-memory view of one namespace directory:
+
+        records.jsonl  one {"id", "text", "metadata"} per row
+        postings.npz   terms (sorted), offsets into rows/tfs per term, rows (int32),
+                       tfs (uint16) and per-row token counts
+    """
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(os.path.join(path, "postings.npz")).st_mtime_ns
+        self.records = []
+        with open(os.path.join(path, "records.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self.records.append(json.loads(line))
+        with np.load(os.path.join(path, "postings.npz")) as data:
+            terms = data["terms"]
+            self.offsets = data["offsets"]
+            self.rows = data["rows"]
+            self.tfs = data["tfs"].astype(np.float32)
+            self.lengths = data["lengths"].astype(np.float32)
+        self.term_index = {term: i for i, term in enumerate(terms.tolist())}
+        self.avg_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+
+    def __len__(self):
+        return len(self.records)
+
+
+class KeywordIndex:
+    """
+    Local BM25 inverted index over the same chunks as the vector index, one directory per
+    namespace. Needs no network, so it works next to either vector backend.
+
+    Like LocalBackend, writes are staged in memory and persisted by flush(), which rebuilds
+    the postings of every changed namespace. `files.json` lists the processed files whose
+    chunks are in the index.
+    """
+    def __init__(self, root="data/keyword_index", k1=1.2, b=0.75):
+        self.root = root
+        self.k1 = k1
+        self.b = b
+        self._loaded = {}
+        self._pending = {}
+        self._files = None
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _ns_path(self, namespace):
+        return os.path.join(self.root, namespace)
+
+    def _files_path(self):
+        return os.path.join(self.root, "files.json")
+
+    def files(self):
+        """
+        {processed file: namespace} for every file whose chunks are indexed.
+        """
+        with self._lock:
+            if self._files is None:
+                try:
+                    with open(self._files_path(), "r", encoding="utf-8") as f:
+                        self._files = json.load(f)
+                except (OSError, ValueError):
+                    self._files = {}
+            return dict(self._files)
+
+    def mark_file(self, file, namespace):
+        self.files()
+        with self._lock:
+            self._files[file] = namespace
+
+    def forget_file(self, file):
+        self.files()
+        with self._lock:
+            self._files.pop(file, None)
+
+    def _get(self, namespace):
+        path = self._ns_path(namespace)
+        postings_path = os.path.join(path, "postings.npz")
+        if not os.path.exists(postings_path):
+            return None
+        with self._lock:
+            ns = self._loaded.get(namespace)
+            if ns is None or ns.mtime != os.stat(postings_path).st_mtime_ns:
+                ns = _KeywordNamespace(path)
+                self._loaded[namespace] = ns
+            return ns
+
+    def _pending_for(self, namespace):
+        return self._pending.setdefault(namespace, {"upserts": {}, "deletes": set()})
+
+    def upsert(self, namespace, ids, documents):
+        with self._lock:
+            pending = self._pending_for(namespace)
+            for chunk_id, doc in zip(ids, documents):
+                pending["deletes"].discard(chunk_id)
+                pending["upserts"][chunk_id] = {"id": chunk_id, "text": doc.page_content, "metadata": doc.metadata}
+
+    def delete(self, namespace, ids):
+        with self._lock:
+            pending = self._pending_for(namespace)
+            for chunk_id in ids:
+                pending["upserts"].pop(chunk_id, None)
+                pending["deletes"].add(chunk_id)
+
+    def list_namespaces(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, "postings.npz"))
+        )
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            files = dict(self._files) if self._files is not None else None
+        for namespace, changes in pending.items():
+            self._write_namespace(namespace, changes)
+        if files is not None:
+            tmp_path = self._files_path() + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(files, f)
+            os.replace(tmp_path, self._files_path())
+
+    def _write_namespace(self, namespace, changes):
+        current = self._get(namespace)
+        replaced = set(changes["upserts"]) | changes["deletes"]
+        records = [rec for rec in current.records if rec["id"] not in replaced] if current else []
+        records.extend(changes["upserts"].values())
+
+        path = self._ns_path(namespace)
+        if not records:
+            shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                self._loaded.pop(namespace, None)
+            return
+
+        # Term -> [(row, tf)] from every record, then flattened into sorted postings arrays
+        postings = {}
+        lengths = np.zeros(len(records), dtype=np.int32)
+        for row, rec in enumerate(records):
+            tokens = tokenize(rec["text"])
+            lengths[row] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((row, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        rows, tfs = [], []
+        for i, term in enumerate(terms):
+            entries = postings[term]
+            rows.extend(row for row, _ in entries)
+            tfs.extend(min(tf, 65535) for _, tf in entries)
+            offsets[i + 1] = len(rows)
+
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        with open(os.path.join(tmp_path, "records.jsonl"), "w", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        np.savez_compressed(
+            os.path.join(tmp_path, "postings.npz"),
+            terms=np.array(terms, dtype=str),
+            offsets=offsets,
+            rows=np.array(rows, dtype=np.int32),
+            tfs=np.array(tfs, dtype=np.uint16),
+            lengths=lengths
+        )
+
+        old_path = path + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        with self._lock:
+            self._loaded.pop(namespace, None)
+        print(f"  Keyword index '{namespace}' written: {len(records)} chunks, {len(terms)} terms")
+
+    def query(self, namespace, text, k=3, filter=None):
+        """
+        BM25 top-k. Returns (Document, score) pairs, best match first.
+        """
+        ns = self._get(namespace)
+        if ns is None or not len(ns):
+            return []
+
+        n = len(ns)
+        scores = np.zeros(n, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * ns.lengths / max(ns.avg_length, 1e-9))
+        for term in set(tokenize(text)):
+            i = ns.term_index.get(term)
+            if i is None:
+                continue
+            start, end = ns.offsets[i], ns.offsets[i + 1]
+            rows, tfs = ns.rows[start:end], ns.tfs[start:end]
+            df = end - start
+            idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm[rows])
+
+        candidates = np.flatnonzero(scores)
+        if filter:
+            candidates = np.array([row for row in candidates if matches_filter(ns.records[row]["metadata"], filter)], dtype=np.int64)
+        if not len(candidates):
+            return []
+
+        top = min(k, len(candidates))
+        best = candidates[np.argpartition(-scores[candidates], top - 1)[:top]]
+        best = best[np.argsort(-scores[best])]
+        return [
+            (Document(page_content=ns.records[row]["text"], metadata=dict(ns.records[row]["metadata"])), float(scores[row]))
+            for row in best
+        ]
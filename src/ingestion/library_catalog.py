@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+import threading
+from src.ingestion.processed_store import list_processed, read_metadata, page_count
+
+
+def display_subject(metadata, processed_file):
+    """
+    Subject shown in the library. Social Science books are split into their disciplines.
+    """
+    subject = metadata.get("subject", "General")
+    filename_base = metadata.get("filename", processed_file)
+    if "jess1" in filename_base or subject == "Social1":
+        return "Geography"
+    if "jess2" in filename_base or "Social-Economics" in subject:
+        return "Economics"
+    if "jess4" in filename_base or "Social-Politics" in subject:
+        return "Politics"
+    if "jess3" in filename_base:
+        return "History"
+    return subject
+
+
+class LibraryCatalog:
+    """
+    Persisted catalog of completed processed books (data/library_catalog.json):
+
+        {"books": {processed file: {"id", "title", "grade", "subject", "raw_subject",
+                                    "filename", "page_count", "size", "mtime"}}}
+
+    DataIngestor updates it as each book completes, so /library never opens book files.
+    The rendered library and its ETag are cached in memory and rebuilt only when the
+    catalog file changes (also when another process, e.g. the ingestion CLI, wrote it).
+    """
+    def __init__(self, processed_dir="data/processed", path=None):
+        self.processed_dir = processed_dir
+        default_path = os.path.join(os.path.dirname(os.path.normpath(processed_dir)), "library_catalog.json")
+        self.path = path or os.getenv("LIBRARY_CATALOG_PATH", default_path)
+        self._lock = threading.Lock()
+        self._books = None
+        self._mtime = None
+        self._snapshot = None
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        """
+        Reloads the catalog if the file changed since it was last read. Caller holds the lock.
+        """
+        mtime = self._file_mtime()
+        if self._books is not None and mtime == self._mtime:
+            return
+        books = {}
+        if mtime is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    books = json.load(f).get("books", {})
+            except (OSError, ValueError) as e:
+                print(f"Could not read library catalog {self.path}: {e}")
+        self._books = books
+        self._mtime = mtime
+        self._snapshot = None
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"books": self._books}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self._mtime = self._file_mtime()
+        self._snapshot = None
+
+    def _entry(self, processed_file):
+        path = os.path.join(self.processed_dir, processed_file)
+        stat = os.stat(path)
+        metadata = read_metadata(path)
+        return {
+            "id": processed_file,
+            # The original PDF filename is used as the title
+            "title": metadata.get("filename", processed_file),
+            "grade": metadata.get("grade", "10"),
+            "subject": display_subject(metadata, processed_file),
+            "raw_subject": metadata.get("subject", "General"),
+            "filename": metadata.get("filename"),
+            "page_count": page_count(path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns
+        }
+
+    def update(self, processed_file):
+        """
+        Adds or refreshes one completed book.
+        """
+        entry = self._entry(processed_file)
+        with self._lock:
+            self._load()
+            self._books[processed_file] = entry
+            self._save()
+
+    def remove(self, processed_file):
+        with self._lock:
+            self._load()
+            if self._books.pop(processed_file, None) is not None:
+                self._save()
+
+    def sync(self):
+        """
+        Reconciles the catalog with the processed directory (books added, changed or deleted
+        outside DataIngestor). Only files whose size or mtime changed are re-read.
+        """
+        files = list_processed(self.processed_dir)
+        with self._lock:
+            self._load()
+            changed = False
+            for file in set(self._books) - set(files):
+                del self._books[file]
+                changed = True
+            for file in files:
+                try:
+                    stat = os.stat(os.path.join(self.processed_dir, file))
+                    known = self._books.get(file)
+                    if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime_ns:
+                        continue
+                    self._books[file] = self._entry(file)
+                    changed = True
+                except Exception as e:
+                    print(f"Error processing {file}: {e}")
+            if changed or self._mtime is None:
+                self._save()
+            print(f"Library catalog: {len(self._books)} books")
+
+    def books(self):
+        with self._lock:
+            self._load()
+            return [dict(self._books[file]) for file in sorted(self._books)]
+
+    def snapshot(self):
+        """
+        Returns (library payload, ETag) from memory.
+        """
+        with self._lock:
+            self._load()
+            if self._snapshot is None:
+                library = {}
+                for file in sorted(self._books):
+                    book = self._books[file]
+                    library.setdefault(book["subject"], []).append({
+                        "id": book["id"],
+                        "title": book["title"],
+                        "grade": book["grade"],
+                        "filename": book["filename"],
+                        "page_count": book["page_count"]
+                    })
+                payload = {"subjects": [{"subject": subject, "chapters": chapters} for subject, chapters in library.items()]}
+                body = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+                self._snapshot = (payload, '"' + hashlib.sha1(body).hexdigest() + '"')
+            return self._snapshot
@@ -0,0 +1,423 @@
+import os
+import json
+import shutil
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from src.ingestion.vector_backends import VectorBackend
+from src.ingestion.exact_search import ExactSearchKernel, row_norms
+
+
+def matches_filter(metadata, filter):
+    """
+    Evaluates a Pinecone-style metadata filter ({"key": value}, $eq, $ne, $in, $nin).
+    """
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _row_order_key(rec):
+    """
+    Storage order of a namespace: by file, then page, then offset, so each chapter (and
+    each page) occupies a contiguous block of rows.
+    """
+    meta = rec["metadata"]
+    page = meta.get("page")
+    page_key = (0, page, "") if isinstance(page, (int, float)) else (1, 0, str(page))
+    return (str(meta.get("filename") or ""), page_key, meta.get("start_index") or 0, rec["id"])
+
+
+def _as_rows(rows):
+    """
+    A slice for a contiguous run of row indices, else an index array.
+    """
+    if rows[-1] - rows[0] + 1 == len(rows):
+        return slice(rows[0], rows[-1] + 1)
+    return np.array(rows, dtype=np.int64)
+
+
+def _equality_values(condition):
+    """
+    Values a filter condition pins a key to ({"key": v}, $eq, $in), or None.
+    """
+    if not isinstance(condition, dict):
+        return [condition]
+    if set(condition) == {"$eq"}:
+        return [condition["$eq"]]
+    if set(condition) == {"$in"}:
+        return list(condition["$in"])
+    return None
+
+
+def quantize_rows(vectors):
+    """
+    Symmetric per-row int8 quantization. Returns (int8 matrix, float32 scales).
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class _Namespace:
+    """
+    In-memory view of one namespace directory:
+
+        vectors.npy    (N, d) float32, float16 or int8, unit-normalised rows (memory-mapped)
+        scales.npy     (N,) float32 dequantization scales, int8 only
+        norms.npy      (N,) float32 norms of the stored rows, so rounded rows score exact cosines
+        records.jsonl  one {"id", "text", "metadata"} per row, same order as vectors
+        ivf.npz        IVF lists: centroids, row order grouped by list, list offsets
+
+    Rows are stored grouped by filename and page, and `file_rows` / `page_rows` map each
+    filename and (filename, page) to its row range (built from the records on load).
+    """
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(os.path.join(path, "vectors.npy")).st_mtime_ns
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        scales_path = os.path.join(path, "scales.npy")
+        self.scales = np.load(scales_path) if os.path.exists(scales_path) else None
+        norms_path = os.path.join(path, "norms.npy")
+        # Indexes written before norms.npy existed get them computed on load
+        norms = np.load(norms_path) if os.path.exists(norms_path) else None
+        self.kernel = ExactSearchKernel(self.vectors, self.scales, norms)
+
+        self.records = []
+        with open(os.path.join(path, "records.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self.records.append(json.loads(line))
+        self.row_of = {rec["id"]: row for row, rec in enumerate(self.records)}
+
+        files, pages = {}, {}
+        for row, rec in enumerate(self.records):
+            filename = rec["metadata"].get("filename")
+            files.setdefault(filename, []).append(row)
+            pages.setdefault((filename, rec["metadata"].get("page")), []).append(row)
+        self.file_rows = {key: _as_rows(rows) for key, rows in files.items()}
+        self.page_rows = {key: _as_rows(rows) for key, rows in pages.items()}
+
+        self.ivf = None
+        ivf_path = os.path.join(path, "ivf.npz")
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path) as data:
+                self.ivf = {name: data[name] for name in data.files}
+
+    def __len__(self):
+        return len(self.records)
+
+    def scope(self, filter):
+        """
+        Resolves a filter that pins the filename (and optionally the page) to the rows it
+        can match. Returns (rows, remaining filter), or None if the filter does not pin a file.
+        """
+        filenames = _equality_values(filter.get("filename")) if filter and "filename" in filter else None
+        if filenames is None:
+            return None
+        pages = _equality_values(filter["page"]) if "page" in filter else None
+        if pages is not None:
+            blocks = [self.page_rows[key] for key in ((f, p) for f in filenames for p in pages) if key in self.page_rows]
+            consumed = ("filename", "page")
+        else:
+            blocks = [self.file_rows[f] for f in filenames if f in self.file_rows]
+            consumed = ("filename",)
+        remaining = {key: value for key, value in filter.items() if key not in consumed}
+
+        if not blocks:
+            return np.zeros(0, dtype=np.int64), remaining
+        if len(blocks) == 1:
+            return blocks[0], remaining
+        return np.concatenate([
+            np.arange(b.start, b.stop) if isinstance(b, slice) else b for b in blocks
+        ]), remaining
+
+
+class LocalBackend(VectorBackend):
+    """
+    On-disk ANN index: one directory per namespace holding a memory-mapped embedding
+    matrix, a metadata sidecar and an IVF (inverted file) index. Needs no network.
+
+    Writes are staged in memory and persisted by flush(), which also rebuilds the IVF lists.
+    Queries filtered to a filename (e.g. one chapter) skip the IVF and score exactly that
+    file's contiguous block of rows.
+
+    search="exact" (LOCAL_INDEX_SEARCH) scores every row with ExactSearchKernel instead of
+    probing the IVF lists: milliseconds for a namespace of tens of thousands of chunks, with
+    exact recall. query_batch() is always exact.
+    """
+    name = "local"
+
+    def __init__(self, root="data/vector_index", dimension=384, dtype="float32",
+                 nprobe=None, ivf_min_rows=4096, kmeans_iters=10, search=None):
+        if dtype not in ("float32", "float16", "int8"):
+            raise ValueError(f"Unsupported local index dtype: {dtype}")
+        self.search = search or os.getenv("LOCAL_INDEX_SEARCH", "ivf")
+        if self.search not in ("ivf", "exact"):
+            raise ValueError(f"Unsupported local index search mode: {self.search}")
+        self.root = root
+        self.dimension = dimension
+        self.dtype = dtype
+        self.nprobe = nprobe or int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+        self.ivf_min_rows = ivf_min_rows
+        self.kmeans_iters = kmeans_iters
+        self._loaded = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        print(f"Local vector index at {self.root} ({self.dtype}, dim={self.dimension}, {self.search} search)")
+
+    def _ns_path(self, namespace):
+        return os.path.join(self.root, namespace)
+
+    def _get(self, namespace):
+        """
+        Returns the loaded namespace, reloading it if another process rewrote it.
+        """
+        path = self._ns_path(namespace)
+        vectors_path = os.path.join(path, "vectors.npy")
+        if not os.path.exists(vectors_path):
+            return None
+        with self._lock:
+            ns = self._loaded.get(namespace)
+            if ns is None or ns.mtime != os.stat(vectors_path).st_mtime_ns:
+                ns = _Namespace(path)
+                self._loaded[namespace] = ns
+            return ns
+
+    def _pending_for(self, namespace):
+        return self._pending.setdefault(namespace, {"upserts": {}, "deletes": set()})
+
+    def upsert(self, namespace, ids, vectors, documents):
+        vectors = normalize_rows(vectors)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Dimension mismatch (Index: {self.dimension}, Vectors: {vectors.shape[1]})")
+        with self._lock:
+            pending = self._pending_for(namespace)
+            for chunk_id, vector, doc in zip(ids, vectors, documents):
+                pending["deletes"].discard(chunk_id)
+                pending["upserts"][chunk_id] = (vector, {
+                    "id": chunk_id,
+                    "text": doc.page_content,
+                    "metadata": doc.metadata
+                })
+
+    def delete(self, namespace, ids):
+        with self._lock:
+            pending = self._pending_for(namespace)
+            for chunk_id in ids:
+                pending["upserts"].pop(chunk_id, None)
+                pending["deletes"].add(chunk_id)
+
+    def list_namespaces(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, "vectors.npy"))
+        )
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for namespace, changes in pending.items():
+            self._write_namespace(namespace, changes)
+
+    def _write_namespace(self, namespace, changes):
+        current = self._get(namespace)
+        replaced = set(changes["upserts"]) | changes["deletes"]
+
+        # Keep existing rows (in their stored dtype) that are not being replaced or deleted
+        if current is not None:
+            keep = [row for row, rec in enumerate(current.records) if rec["id"] not in replaced]
+            old_vectors = np.asarray(current.vectors[keep])
+            old_scales = current.scales[keep] if current.scales is not None else None
+            records = [current.records[row] for row in keep]
+        else:
+            old_vectors = np.zeros((0, self.dimension), dtype=self.dtype)
+            old_scales = np.zeros(0, dtype=np.float32) if self.dtype == "int8" else None
+            records = []
+
+        new_vectors = np.array([vec for vec, _ in changes["upserts"].values()], dtype=np.float32)
+        new_vectors = new_vectors.reshape(-1, self.dimension)
+        records.extend(rec for _, rec in changes["upserts"].values())
+
+        # Convert rows written with the other dtype setting
+        if self.dtype == "int8" and old_scales is None:
+            old_vectors, old_scales = quantize_rows(old_vectors.astype(np.float32))
+        elif self.dtype != "int8" and old_scales is not None:
+            old_vectors = old_vectors.astype(np.float32) * old_scales[:, None]
+
+        if self.dtype == "int8":
+            quantized, new_scales = quantize_rows(new_vectors)
+            vectors = np.concatenate([old_vectors.astype(np.int8), quantized])
+            scales = np.concatenate([old_scales, new_scales])
+        else:
+            vectors = np.concatenate([old_vectors.astype(np.float32), new_vectors]).astype(self.dtype)
+            scales = None
+
+        # Group rows by file and page (see _Namespace.file_rows)
+        order = sorted(range(len(records)), key=lambda row: _row_order_key(records[row]))
+        if order != list(range(len(records))):
+            records = [records[row] for row in order]
+            vectors = vectors[order]
+            scales = scales[order] if scales is not None else None
+
+        path = self._ns_path(namespace)
+        if not records:
+            shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                self._loaded.pop(namespace, None)
+            return
+
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        with open(os.path.join(tmp_path, "records.jsonl"), "w", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        if scales is not None:
+            np.save(os.path.join(tmp_path, "scales.npy"), scales)
+        np.save(os.path.join(tmp_path, "vectors.npy"), vectors)
+        np.save(os.path.join(tmp_path, "norms.npy"), row_norms(vectors, scales))
+
+        ivf = self._build_ivf(vectors, scales)
+        if ivf is not None:
+            np.savez(os.path.join(tmp_path, "ivf.npz"), **ivf)
+
+        # Swap the new directory in
+        old_path = path + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        with self._lock:
+            self._loaded.pop(namespace, None)
+        print(f"  Local index '{namespace}' written: {len(records)} vectors" + (" (IVF)" if ivf else ""))
+
+    def _build_ivf(self, vectors, scales):
+        """
+        Spherical k-means over the namespace. Small namespaces are searched exhaustively instead.
+        """
+        n = len(vectors)
+        if n < self.ivf_min_rows:
+            return None
+
+        data = vectors.astype(np.float32)
+        if scales is not None:
+            data *= scales[:, None]
+        nlist = int(np.sqrt(n))
+        rng = np.random.default_rng(0)
+        centroids = data[rng.choice(n, nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = data[assign == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = normalize_rows(centroids)
+
+        assign = np.argmax(data @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+        return {"centroids": centroids.astype(np.float32), "order": order, "offsets": offsets}
+
+    def _candidate_rows(self, ns, query):
+        if ns.ivf is None:
+            return None
+        centroids, order, offsets = ns.ivf["centroids"], ns.ivf["order"], ns.ivf["offsets"]
+        nprobe = min(self.nprobe, len(centroids))
+        probe = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probe])
+
+    def query(self, namespace, vector, k=3, filter=None):
+        ns = self._get(namespace)
+        if ns is None or not len(ns):
+            return []
+        query = normalize_rows(vector)[0]
+
+        scope = ns.scope(filter)
+        if scope is not None:
+            # Exact search over the file's rows; faster and more accurate than IVF + filter
+            rows, remaining = scope
+            return self._top_k(ns, rows, query, k, remaining)
+
+        rows = self._candidate_rows(ns, query) if self.search == "ivf" else None
+        results = self._top_k(ns, rows, query, k, filter)
+        if rows is not None and len(results) < k:
+            # The probed lists did not hold enough matches for the filter, scan everything
+            results = self._top_k(ns, None, query, k, filter)
+        return results
+
+    def query_batch(self, namespace, vectors, k=3, filter=None):
+        """
+        Exact top-k for many query vectors at once (one matrix product per block of rows).
+        Returns one list of (Document, score) pairs per query.
+        """
+        ns = self._get(namespace)
+        vectors = normalize_rows(vectors)
+        if ns is None or not len(ns):
+            return [[] for _ in vectors]
+        scope = ns.scope(filter)
+        rows, filter = scope if scope is not None else (None, filter)
+        rows = self._filter_rows(ns, rows, filter)
+        if rows is not None and not isinstance(rows, slice) and not len(rows):
+            return [[] for _ in vectors]
+        scores, best = ns.kernel.search(vectors, k, rows)
+        return [self._results(ns, row_ids, row_scores) for row_ids, row_scores in zip(best, scores)]
+
+    @staticmethod
+    def _filter_rows(ns, rows, filter):
+        """
+        Rows (None = all, a slice or an index array) narrowed to those matching `filter`.
+        """
+        if not filter:
+            return rows
+        if rows is None:
+            candidates = range(len(ns))
+        elif isinstance(rows, slice):
+            candidates = range(rows.start, rows.stop)
+        else:
+            candidates = rows
+        return np.array([row for row in candidates if matches_filter(ns.records[row]["metadata"], filter)], dtype=np.int64)
+
+    @staticmethod
+    def _results(ns, rows, scores):
+        results = []
+        for row, score in zip(rows, scores):
+            rec = ns.records[int(row)]
+            results.append((Document(page_content=rec["text"], metadata=dict(rec["metadata"])), float(score)))
+        return results
+
+    def _top_k(self, ns, rows, query, k, filter):
+        rows = self._filter_rows(ns, rows, filter)
+        if rows is not None and not isinstance(rows, slice) and not len(rows):
+            return []
+        scores, best = ns.kernel.search(query, k, rows)
+        return self._results(ns, best[0], scores[0])
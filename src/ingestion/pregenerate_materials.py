@@ -0,0 +1,105 @@
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+def parse_limits(values, flag):
+    """
+    ["OpenRouterLLM=20", ...] -> {"OPENROUTERLLM": "20", ...}
+    """
+    limits = {}
+    for value in values or []:
+        name, _, limit = value.partition("=")
+        if not limit:
+            raise SystemExit(f"{flag} expects PROVIDER=VALUE, got: {value}")
+        limits[name.strip().upper()] = limit.strip()
+    return limits
+
+def main():
+    """
+    Pre-generates study materials for every chapter in the library catalog so /assessment,
+    /mindmap and /summary serve them without retrieval or an LLM call.
+
+    Resumable: results are stored as each one completes and anything already stored for the
+    current version of its source files is skipped, so an interrupted run continues where it stopped.
+    """
+    parser = argparse.ArgumentParser(description="Pre-generate assessments, mindmaps and summaries for every chapter.")
+    parser.add_argument("--dir", default="data/processed", help="Directory containing processed books")
+    parser.add_argument("--kinds", nargs="+", default=["assessment", "mindmap", "summary"],
+                        choices=["assessment", "mindmap", "summary"], help="Materials to generate")
+    parser.add_argument("--subject", default=None, help="Only chapters of this library subject")
+    parser.add_argument("--grade", default=None, help="Only chapters of this grade")
+    parser.add_argument("--workers", type=int, default=4, help="Chapters generated in parallel")
+    parser.add_argument("--concurrency", nargs="*", metavar="PROVIDER=N",
+                        help="Concurrent requests per LLM provider, e.g. OpenRouterLLM=2 LocalLLM=1")
+    parser.add_argument("--rate", nargs="*", metavar="PROVIDER=RPM",
+                        help="Requests per minute per LLM provider, e.g. OpenRouterLLM=20")
+    parser.add_argument("--queue-timeout", type=float, default=600,
+                        help="Seconds a request may wait for a throttled provider before falling back")
+    parser.add_argument("--force", action="store_true", help="Regenerate materials that are already stored")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # Per-provider throttles are the router's own settings (LLM_CONCURRENCY_* / LLM_RATE_LIMIT_*)
+    for name, value in parse_limits(args.concurrency, "--concurrency").items():
+        os.environ[f"LLM_CONCURRENCY_{name}"] = value
+    for name, value in parse_limits(args.rate, "--rate").items():
+        os.environ[f"LLM_RATE_LIMIT_{name}"] = value
+    # Batch runs wait for rate-limit slots longer than the API would (LLM_QUEUE_TIMEOUT, 30s)
+    os.environ["LLM_QUEUE_TIMEOUT"] = str(args.queue_timeout)
+
+    from src.ingestion.library_catalog import LibraryCatalog
+    from src.rag.rag_pipeline import RAGPipeline
+    from src.rag.artifact_cache import ArtifactCache
+    from src.rag.study_materials import StudyMaterials
+
+    catalog = LibraryCatalog(processed_dir=args.dir)
+    catalog.sync()
+    books = [
+        book for book in catalog.books()
+        if (not args.subject or book["subject"] == args.subject) and (not args.grade or book["grade"] == args.grade)
+    ]
+
+    pipeline = RAGPipeline()
+    materials = StudyMaterials(pipeline, ArtifactCache(os.getenv("ARTIFACT_CACHE_PATH", "data/artifacts.db")))
+    materials.artifacts.prune(pipeline.vector_store.source_version)
+
+    tasks = []
+    skipped = 0
+    for book in books:
+        for kind in args.kinds:
+            if not args.force and materials.cached(kind, book["title"], book["subject"], book["grade"], book["filename"]) is not None:
+                skipped += 1
+                continue
+            tasks.append((book, kind))
+    print(f"{len(books)} chapters: {len(tasks)} materials to generate, {skipped} already stored")
+
+    def generate(book, kind):
+        getattr(materials, kind)(book["title"], subject=book["subject"], grade=book["grade"],
+                                 filename=book["filename"], refresh=args.force)
+        return materials.cached(kind, book["title"], book["subject"], book["grade"], book["filename"]) is not None
+
+    started = time.perf_counter()
+    stored, failed = 0, []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(generate, book, kind): (book, kind) for book, kind in tasks}
+        for i, future in enumerate(as_completed(futures), start=1):
+            book, kind = futures[future]
+            try:
+                if future.result():
+                    stored += 1
+                else:
+                    failed.append(f"{kind}:{book['id']}")
+            except Exception as e:
+                print(f"  ERROR: {kind} for {book['id']}: {e}")
+                failed.append(f"{kind}:{book['id']}")
+            print(f"  [{i}/{len(tasks)}] {kind} for {book['title']} ({time.perf_counter() - started:.0f}s)")
+
+    print(f"\nDone: {stored} stored, {len(failed)} failed, {skipped} skipped in {time.perf_counter() - started:.0f}s")
+    if failed:
+        print(f"Re-run to retry: {failed}")
+    print(f"LLM providers: {pipeline.router.stats()}")
+
+if __name__ == "__main__":
+    main()
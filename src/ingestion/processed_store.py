@@ -0,0 +1,163 @@
+"""
+Processed book format.
+
+Streaming JSONL (written by DataIngestor), one JSON object per line:
+
+    {"metadata": {"source": ..., "filename": ..., "grade": ..., "subject": ...}}
+    {"page_number": 1, "content": "...", "type": "text"}
+    ...
+    {"complete": true, "page_count": 290}
+
+The trailer is only written once every page is in, so a file without it is an
+interrupted ingestion that can be resumed. Legacy whole-book `.json` files
+({"metadata": ..., "pages": [...]}) are still readable.
+"""
+import os
+import json
+
+
+PROCESSED_EXTENSIONS = (".jsonl", ".json")
+
+
+def list_processed(processed_dir, complete_only=True):
+    """
+    Processed book files in a directory. A book present in both formats is listed once, as JSONL.
+    """
+    if not os.path.isdir(processed_dir):
+        return []
+    files = sorted(f for f in os.listdir(processed_dir) if f.endswith(PROCESSED_EXTENSIONS))
+    jsonl = {f[:-len(".jsonl")] for f in files if f.endswith(".jsonl")}
+    result = []
+    for file in files:
+        if file.endswith(".json") and file[:-len(".json")] in jsonl:
+            continue
+        if complete_only and not is_complete(os.path.join(processed_dir, file)):
+            continue
+        result.append(file)
+    return result
+
+
+def _last_line(path):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        pos = end
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(end - pos)
+            lines = block.rstrip(b"\n").split(b"\n")
+            if len(lines) > 1 or pos == 0:
+                return lines[-1].decode("utf-8", errors="replace")
+    return ""
+
+
+def is_complete(path):
+    if path.endswith(".json"):
+        return True
+    try:
+        return json.loads(_last_line(path)).get("complete", False)
+    except (ValueError, OSError):
+        return False
+
+
+def read_metadata(path):
+    """
+    Book metadata. For JSONL only the first line is read.
+    """
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.loads(f.readline())["metadata"]
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("metadata", {})
+
+
+def iter_pages(path):
+    """
+    Yields page dicts one at a time.
+    """
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            f.readline()
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "page_number" in record:
+                    yield record
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    yield from data.get("pages", [])
+
+
+def page_count(path):
+    if path.endswith(".jsonl"):
+        try:
+            trailer = json.loads(_last_line(path))
+            if trailer.get("complete"):
+                return trailer["page_count"]
+        except (ValueError, KeyError, OSError):
+            pass
+    return sum(1 for _ in iter_pages(path))
+
+
+class ProcessedWriter:
+    """
+    Appends pages to a JSONL book file, one flushed line per page.
+    If an incomplete file already exists it is resumed after its last intact page.
+    """
+    def __init__(self, path, metadata):
+        self.path = path
+        self.pages_written = 0
+
+        resumed = self._recover() if os.path.exists(path) and not is_complete(path) else None
+        if resumed is not None:
+            self.pages_written = resumed
+            self.file = open(path, "a", encoding="utf-8")
+        else:
+            self.file = open(path, "w", encoding="utf-8")
+            self._write({"metadata": metadata})
+
+    def _recover(self):
+        """
+        Counts intact page lines and truncates a partially written last line.
+        Returns None if not even the metadata line survived.
+        """
+        pages = 0
+        valid_bytes = 0
+        has_metadata = False
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if "page_number" in record:
+                    pages += 1
+                has_metadata = has_metadata or "metadata" in record
+                valid_bytes += len(line)
+        if not has_metadata:
+            return None
+        with open(self.path, "r+b") as f:
+            f.truncate(valid_bytes)
+        return pages
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def write_page(self, page):
+        self._write(page)
+        self.pages_written += 1
+
+    def complete(self):
+        self._write({"complete": True, "page_count": self.pages_written})
+        self.close()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
@@ -0,0 +1,188 @@
+import os
+import uuid
+import threading
+from collections import OrderedDict
+
+
+class VectorBackend:
+    """
+    Storage/search interface used by VectorStoreManager.
+    Vectors arrive already embedded, so backends never touch the embedding model.
+    """
+    name = "base"
+    # Metadata key the chunk text is stored under (same as langchain_pinecone)
+    text_key = "text"
+
+    def upsert(self, namespace, ids, vectors, documents):
+        """
+        Insert or replace vectors. `documents` are the langchain Documents the vectors were built from.
+        """
+        raise NotImplementedError
+
+    def query(self, namespace, vector, k=3, filter=None):
+        """
+        Returns a list of (Document, score) pairs, best match first.
+        """
+        raise NotImplementedError
+
+    def query_batch(self, namespace, vectors, k=3, filter=None):
+        """
+        One result list per query vector. Backends that can score queries together override this.
+        """
+        return [self.query(namespace, vector, k=k, filter=filter) for vector in vectors]
+
+    def delete(self, namespace, ids):
+        raise NotImplementedError
+
+    def list_namespaces(self):
+        raise NotImplementedError
+
+    def flush(self):
+        """
+        Called after a batch of upserts/deletes. Backends that stage writes persist them here.
+        """
+        pass
+
+
+class HandleRegistry:
+    """
+    Thread-safe, bounded LRU of per-namespace handles. `factory(namespace)` builds a handle
+    on first use; afterwards the same object is shared by every request.
+    """
+    def __init__(self, factory, max_size=64):
+        self.factory = factory
+        self.max_size = max_size
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def get(self, namespace):
+        with self._lock:
+            handle = self._handles.get(namespace)
+            if handle is not None:
+                self._handles.move_to_end(namespace)
+                self.reused += 1
+                return handle
+
+        # Build outside the lock so a slow factory does not block other namespaces
+        handle = self.factory(namespace)
+        with self._lock:
+            existing = self._handles.get(namespace)
+            if existing is not None:
+                self.reused += 1
+                return existing
+            self._handles[namespace] = handle
+            self.created += 1
+            while len(self._handles) > self.max_size:
+                self._handles.popitem(last=False)
+            return handle
+
+    def clear(self):
+        with self._lock:
+            self._handles.clear()
+
+    def __len__(self):
+        return len(self._handles)
+
+
+class PineconeBackend(VectorBackend):
+    name = "pinecone"
+
+    def __init__(self, index_name, embeddings, dimension=384, pool_threads=None, max_handles=None):
+        self.index_name = index_name
+        self.embeddings = embeddings
+        self.pool_threads = pool_threads or int(os.getenv("PINECONE_POOL_THREADS", "8"))
+        self._index = None
+        self._index_lock = threading.Lock()
+        self.stores = HandleRegistry(self._build_store, max_size=max_handles or int(os.getenv("PINECONE_MAX_HANDLES", "64")))
+        self.api_key = os.getenv("PINECONE_API_KEY")
+        if not self.api_key:
+            raise ValueError("PINECONE_API_KEY environment variable is not set")
+
+        # Imported here so the local backend works without the Pinecone client installed
+        from pinecone import Pinecone, ServerlessSpec
+        self.pc = Pinecone(api_key=self.api_key)
+
+        # Ensure index exists and has correct dimensions
+        try:
+            indexes = self.pc.list_indexes()
+            existing_index_names = [idx.name for idx in indexes]
+
+            if self.index_name in existing_index_names:
+                # Check dimensions
+                desc = self.pc.describe_index(self.index_name)
+                if desc.dimension != dimension:
+                    print(f"Dimension mismatch (Index: {desc.dimension}, Model: {dimension}). Re-creating index...")
+                    self.pc.delete_index(self.index_name)
+                    existing_index_names.remove(self.index_name)
+
+            if self.index_name not in existing_index_names:
+                print(f"Creating Pinecone index: {self.index_name} with dimension {dimension}")
+                self.pc.create_index(
+                    name=self.index_name,
+                    dimension=dimension,
+                    metric="cosine",
+                    spec=ServerlessSpec(cloud="aws", region="us-east-1")
+                )
+        except Exception as e:
+            print(f"Warning/Error checking Pinecone index: {e}")
+
+    @property
+    def index(self):
+        """
+        One shared Index handle (and its HTTP connection pool) for every namespace.
+        """
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = self.pc.Index(self.index_name, pool_threads=self.pool_threads)
+        return self._index
+
+    def _build_store(self, namespace):
+        from langchain_pinecone import PineconeVectorStore
+        return PineconeVectorStore(
+            index=self.index,
+            embedding=self.embeddings,
+            namespace=namespace
+        )
+
+    def upsert(self, namespace, ids, vectors, documents, batch_size=100):
+        index = self.index
+        ids = ids or [str(uuid.uuid4()) for _ in documents]
+        records = []
+        for chunk_id, vector, doc in zip(ids, vectors, documents):
+            metadata = dict(doc.metadata)
+            metadata[self.text_key] = doc.page_content
+            records.append((chunk_id, list(vector), metadata))
+
+        for start in range(0, len(records), batch_size):
+            index.upsert(vectors=records[start:start + batch_size], namespace=namespace)
+
+    def query(self, namespace, vector, k=3, filter=None):
+        return self.stores.get(namespace).similarity_search_by_vector_with_score(vector, k=k, filter=filter)
+
+    def delete(self, namespace, ids):
+        if ids:
+            self.index.delete(ids=list(ids), namespace=namespace)
+
+    def list_namespaces(self):
+        stats = self.index.describe_index_stats()
+        return list(stats.namespaces.keys())
+
+
+def create_backend(name, index_name, embeddings, dimension=384):
+    """
+    Builds a backend from its short name ("pinecone" or "local").
+    """
+    name = (name or "pinecone").lower()
+    if name == "pinecone":
+        return PineconeBackend(index_name, embeddings, dimension=dimension)
+    if name == "local":
+        from src.ingestion.local_index import LocalBackend
+        return LocalBackend(
+            root=os.path.join(os.getenv("LOCAL_INDEX_DIR", "data/vector_index"), index_name),
+            dimension=dimension,
+            dtype=os.getenv("LOCAL_INDEX_DTYPE", "float32")
+        )
+    raise ValueError(f"Unknown vector backend: {name}")
@@ -1,157 +1,240 @@
 import os
-import json
-from pinecone import Pinecone, ServerlessSpec
-from langchain_pinecone import PineconeVectorStore
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+import time
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.ingestion.vector_backends import VectorBackend, create_backend
+from src.ingestion.embedding_cache import QueryEmbeddingCache
+from src.ingestion.embedding_models import load_embeddings
+from src.ingestion.index_manifest import IndexManifest
+from src.ingestion.index_pipeline import IndexingPipeline, make_text_splitter
+from src.ingestion.keyword_index import KeywordIndex
 
 from dotenv import load_dotenv
 
 class VectorStoreManager:
-    def __init__(self, index_name=None, embedding_model="paraphrase-multilingual-MiniLM-L12-v2"):
+    def __init__(self, index_name=None, embedding_model=None, backend=None):
         load_dotenv()
         # Prioritize constructor arg, then .env, then default
         self.index_name = index_name or os.getenv("PINECONE_INDEX_NAME") or "ncert-all"
-        self.api_key = os.getenv("PINECONE_API_KEY")
-        if not self.api_key:
-            raise ValueError("PINECONE_API_KEY environment variable is not set")
-        
-        self.pc = Pinecone(api_key=self.api_key)
-        self.embeddings = HuggingFaceEmbeddings(model_name=embedding_model)
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100,
-            separators=["\n\n", "\n", ".", " ", ""]
-        )
-        self.vector_db = None
-        
-        # Ensure index exists and has correct dimensions
+
+        # Model name, "openvino:<dir>" for the quantized export, or EMBEDDING_MODEL from .env
+        self.embeddings = load_embeddings(embedding_model)
+        self.text_splitter = make_text_splitter()
+        self.manifest_dir = os.getenv("INDEX_MANIFEST_DIR", "data/index_manifests")
+        self._index_lock = threading.Lock()
+        self._generation = None
+        self._versions = None
+        self._versions_lock = threading.Lock()
+
+        # Backend: an instance, or a name ("pinecone" / "local"), falling back to VECTOR_BACKEND
         target_dimension = 384 # MultiLM-L12-v2
-        
-        try:
-            indexes = self.pc.list_indexes()
-            existing_index_names = [idx.name for idx in indexes]
-            
-            if self.index_name in existing_index_names:
-                # Check dimensions
-                desc = self.pc.describe_index(self.index_name)
-                if desc.dimension != target_dimension:
-                    print(f"Dimension mismatch (Index: {desc.dimension}, Model: {target_dimension}). Re-creating index...")
-                    self.pc.delete_index(self.index_name)
-                    existing_index_names.remove(self.index_name)
-            
-            if self.index_name not in existing_index_names:
-                print(f"Creating Pinecone index: {self.index_name} with dimension {target_dimension}")
-                self.pc.create_index(
-                    name=self.index_name,
-                    dimension=target_dimension,
-                    metric="cosine",
-                    spec=ServerlessSpec(cloud="aws", region="us-east-1")
-                )
-        except Exception as e:
-            print(f"Warning/Error checking Pinecone index: {e}")
-        
-        print(f"Vector Store Manager initialized with index: {self.index_name}")
+        if isinstance(backend, VectorBackend):
+            self.backend = backend
+        else:
+            self.backend = create_backend(
+                backend or os.getenv("VECTOR_BACKEND", "pinecone"),
+                self.index_name,
+                self.embeddings,
+                dimension=target_dimension
+            )
 
-    def index_processed_files(self, processed_dir="data/processed"):
+        # Query embeddings are cached and concurrent misses are encoded in one batch
+        self.query_embeddings = QueryEmbeddingCache(
+            self.embeddings,
+            max_size=int(os.getenv("QUERY_CACHE_SIZE", "4096")),
+            ttl=float(os.getenv("QUERY_CACHE_TTL", "3600")),
+            batch_window=float(os.getenv("QUERY_BATCH_WINDOW_MS", "5")) / 1000
+        )
+
+        # Global search fan-out: cached namespace list + a shared pool for per-namespace queries
+        self.namespace_ttl = float(os.getenv("NAMESPACE_CACHE_TTL", "300"))
+        self._namespaces = None
+        self._namespaces_at = 0.0
+        self._namespaces_lock = threading.Lock()
+        self._search_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("SEARCH_FANOUT_WORKERS", "16")),
+            thread_name_prefix="ns-search"
+        )
+
+        # Local BM25 index over the same chunks, fused with dense results (HYBRID_SEARCH=0 to disable)
+        self.keyword_index = KeywordIndex(os.path.join(os.getenv("KEYWORD_INDEX_DIR", "data/keyword_index"), self.index_name))
+        self.hybrid = os.getenv("HYBRID_SEARCH", "1") == "1"
+        self.hybrid_candidates = int(os.getenv("HYBRID_CANDIDATES", "20"))
+        self.rrf_k = int(os.getenv("HYBRID_RRF_K", "60"))
+
+        print(f"Vector Store Manager initialized with index: {self.index_name} ({self.backend.__class__.__name__})")
+
+    def index_processed_files(self, processed_dir="data/processed", full=False, **pipeline_options):
         """
         Loads processed JSON files and indexes them into namespaces based on subject and grade.
+        Incremental by default: unchanged files are skipped, and only new or changed chunks of
+        a modified file are embedded; chunks that disappeared are deleted. `full` re-embeds everything.
+        Chunking, embedding and upserts run as a parallel pipeline (see IndexingPipeline).
         """
         print(f"Index name: {self.index_name}")
-        for file in os.listdir(processed_dir):
-            if file.endswith(".json"):
-                file_path = os.path.join(processed_dir, file)
-                print(f"\nProcessing file: {file}")
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        metadata = data["metadata"]
-                        subject = metadata.get("subject", "General")
-                        grade = metadata.get("grade", "General")
-                        namespace = f"{subject}_{grade}".replace(" ", "_")
-                        
-                        documents = []
-                        for page in data["pages"]:
-                            doc_metadata = metadata.copy()
-                            doc_metadata["page"] = page["page_number"]
-                            doc_metadata["extraction_type"] = page["type"]
-                            
-                            doc = Document(
-                                page_content=page["content"],
-                                metadata=doc_metadata
-                            )
-                            documents.append(doc)
-    
-                        if not documents:
-                            print(f"  Warning: No pages found in {file}")
-                            continue
-    
-                        print(f"  Documents created: {len(documents)}")
-                        # Split documents into chunks
-                        chunks = self.text_splitter.split_documents(documents)
-                        print(f"  Chunks generated: {len(chunks)} (Namespace: {namespace})")
-                        
-                        if not chunks:
-                             print(f"  Warning: No chunks generated for {file}")
-                             continue
-    
-                        # Upsert to Pinecone
-                        print(f"  Starting upsert to Pinecone...")
-                        PineconeVectorStore.from_documents(
-                            documents=chunks,
-                            embedding=self.embeddings,
-                            index_name=self.index_name,
-                            namespace=namespace
-                        )
-                        print(f"  Successfully upserted {len(chunks)} chunks.")
-                except Exception as e:
-                    print(f"  ERROR processing {file}: {e}")
+        # One indexing run at a time per manager (the manifest is read-modify-write)
+        with self._index_lock:
+            pipeline = IndexingPipeline(self, **pipeline_options)
+            return pipeline.run(processed_dir, full=full)
 
-        print(f"Indexing complete for all files in {processed_dir}")
+    def manifest_path(self):
+        return os.path.join(self.manifest_dir, f"{self.backend.name}_{self.index_name}.json")
+
+    def manifest(self):
+        """
+        Manifest of indexed files/chunks for this index and backend.
+        """
+        return IndexManifest(self.manifest_path())
+
+    def index_generation(self):
+        """
+        Manifest generation counter; changes whenever indexed content changes (also from other processes).
+        """
+        path = self.manifest_path()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return 0
+        if self._generation is None or self._generation[0] != mtime:
+            self._generation = (mtime, IndexManifest(path).generation)
+        return self._generation[1]
+
+    def source_version(self, namespace=None, filename=None):
+        """
+        Fingerprint of the indexed files behind `namespace` / `filename` (see IndexManifest.version);
+        unlike index_generation() it does not change when unrelated books are indexed.
+        """
+        path = self.manifest_path()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._versions_lock:
+            if self._versions is None or self._versions[0] != mtime:
+                self._versions = (mtime, IndexManifest(path), {})
+            _, manifest, versions = self._versions
+            if (namespace, filename) not in versions:
+                versions[(namespace, filename)] = manifest.version(namespace, filename)
+            return versions[(namespace, filename)]
+
+    def _commit(self, manifest):
+        # Persist staged vectors first so the manifest never claims chunks that are not stored
+        self.backend.flush()
+        self.keyword_index.flush()
+        manifest.save()
+        self._namespaces = None
+
+    def list_namespaces(self):
+        """
+        Namespace list, cached for NAMESPACE_CACHE_TTL seconds so global search skips the stats call.
+        """
+        with self._namespaces_lock:
+            now = time.monotonic()
+            if self._namespaces is None or now - self._namespaces_at > self.namespace_ttl:
+                self._namespaces = self.backend.list_namespaces()
+                self._namespaces_at = now
+            return self._namespaces
 
     def search(self, query, namespace=None, k=3, filter=None):
         """
         Search for relevant chunks. If namespace is None, search across all available namespaces.
         """
-        if namespace:
-            self.vector_db = PineconeVectorStore(
-                index_name=self.index_name,
-                embedding=self.embeddings,
-                namespace=namespace
-            )
-            return self.vector_db.similarity_search(query, k=k, filter=filter)
-        else:
-            # Global search across all namespaces
-            print("  Starting global search across all namespaces...")
+        return [doc for doc, score in self.search_with_scores(query, namespace=namespace, k=k, filter=filter)]
+
+    def search_with_scores(self, query, namespace=None, k=3, filter=None):
+        """
+        Same as search() but returns (Document, score) pairs.
+        With hybrid search the dense and BM25 rankings are fused and the score is the
+        reciprocal-rank-fusion score; otherwise it is the backend's similarity score.
+        """
+        vector = self.query_embeddings.embed_query(query)
+        if not self.hybrid:
+            return self._dense_search(vector, namespace, k, filter)
+
+        # Both retrievers over-fetch; BM25 runs on the pool while the dense query runs here
+        fetch = max(k, self.hybrid_candidates)
+        keyword = self._search_pool.submit(self._keyword_search, query, namespace, fetch, filter)
+        dense = self._dense_search(vector, namespace, fetch, filter)
+        try:
+            sparse = keyword.result()
+        except Exception as e:
+            print(f"Keyword search failed: {e}")
+            sparse = []
+        return self._fuse([dense, sparse], k)
+
+    def search_batch(self, queries, namespace=None, k=3, filter=None):
+        """
+        Dense-only top-k for many queries at once (offline evaluation, benchmarks): the
+        queries are embedded in one batch and each namespace scores them together through
+        the backend's query_batch(). Returns one list of (Document, score) pairs per query.
+        """
+        if not queries:
+            return []
+        vectors = self.embeddings.embed_documents([self.query_embeddings.normalize(q) for q in queries])
+        namespaces = [namespace] if namespace else self.list_namespaces()
+        candidates = [[] for _ in queries]
+        for ns in namespaces:
             try:
-                index = self.pc.Index(self.index_name)
-                stats = index.describe_index_stats()
-                namespaces = list(stats.namespaces.keys())
-                print(f"  Found namespaces: {namespaces}")
-                
-                all_results = []
-                for ns in namespaces:
-                    print(f"    Searching namespace: {ns}...")
-                    vdb = PineconeVectorStore(
-                        index_name=self.index_name,
-                        embedding=self.embeddings,
-                        namespace=ns
-                    )
-                    # We get slightly more results per namespace to re-rank
-                    results = vdb.similarity_search_with_score(query, k=k, filter=filter)
-                    print(f"    Found {len(results)} results in {ns}")
-                    for doc, score in results:
-                        all_results.append((doc, score))
-                
-                # Sort by score descending and take top k
-                all_results.sort(key=lambda x: x[1], reverse=True)
-                print(f"  Global search finished. Total candidates: {len(all_results)}")
-                return [doc for doc, score in all_results[:k]]
-                
+                for i, results in enumerate(self.backend.query_batch(ns, vectors, k=k, filter=filter)):
+                    candidates[i].extend(results)
             except Exception as e:
-                print(f"Error in global search: {e}")
-                return []
+                print(f"    Batch search failed in namespace {ns}: {e}")
+        return [heapq.nlargest(k, results, key=lambda x: x[1]) for results in candidates]
+
+    def _dense_search(self, vector, namespace, k, filter):
+        if namespace:
+            return self.backend.query(namespace, vector, k=k, filter=filter)
+
+        # Global search: the query is embedded once and every namespace is queried concurrently
+        try:
+            namespaces = self.list_namespaces()
+            futures = [
+                self._search_pool.submit(self.backend.query, ns, vector, k, filter)
+                for ns in namespaces
+            ]
+            candidates = []
+            for ns, future in zip(namespaces, futures):
+                try:
+                    candidates.extend(future.result())
+                except Exception as e:
+                    print(f"    Search failed in namespace {ns}: {e}")
+
+            results = heapq.nlargest(k, candidates, key=lambda x: x[1])
+            print(f"  Global search over {len(namespaces)} namespaces finished. Total candidates: {len(candidates)}")
+            return results
+
+        except Exception as e:
+            print(f"Error in global search: {e}")
+            return []
+
+    def _keyword_search(self, query, namespace, k, filter):
+        if namespace:
+            return self.keyword_index.query(namespace, query, k=k, filter=filter)
+        candidates = []
+        for ns in self.keyword_index.list_namespaces():
+            candidates.extend(self.keyword_index.query(ns, query, k=k, filter=filter))
+        return heapq.nlargest(k, candidates, key=lambda x: x[1])
+
+    @staticmethod
+    def _chunk_key(doc):
+        # Chunks are identified by file, page and offset (see index_manifest.chunk_id)
+        meta = doc.metadata
+        if "start_index" in meta:
+            return (meta.get("filename"), meta.get("page"), meta.get("start_index"))
+        return doc.page_content
+
+    def _fuse(self, rankings, k):
+        """
+        Reciprocal rank fusion: score(d) = sum over rankings of 1 / (HYBRID_RRF_K + rank).
+        """
+        fused = {}
+        for ranking in rankings:
+            for rank, (doc, _) in enumerate(ranking, start=1):
+                key = self._chunk_key(doc)
+                entry = fused.setdefault(key, [doc, 0.0])
+                entry[1] += 1.0 / (self.rrf_k + rank)
+        return heapq.nlargest(k, ((doc, score) for doc, score in fused.values()), key=lambda x: x[1])
 
 if __name__ == "__main__":
     pass
@@ -1,21 +1,58 @@
 import fitz  # PyMuPDF
 import easyocr
 import os
+import multiprocessing
 from PIL import Image
 import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+
+_worker_engine = None
+_worker_doc = None
+
+
+def _init_ocr_worker(languages, torch_threads):
+    """
+    Process-pool initializer: one EasyOCR reader per worker process.
+    Workers run at lower CPU priority (OCR_NICE) so OCR cannot starve query serving.
+    """
+    global _worker_engine
+    nice = int(os.getenv("OCR_NICE", "10"))
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _worker_engine = OCREngine(languages=languages, workers=1)
+
+
+def _ocr_page_in_worker(pdf_path, page_num, text):
+    global _worker_doc
+    if _worker_doc is None or _worker_doc.name != pdf_path:
+        if _worker_doc is not None:
+            _worker_doc.close()
+        _worker_doc = fitz.open(pdf_path)
+    return _worker_engine._ocr_page(_worker_doc[page_num], page_num, text)
+
 
 class OCREngine:
-    def __init__(self, languages=['en', 'hi']):
+    def __init__(self, languages=['en', 'hi'], workers=None):
         """
         Initialize the OCR engine with supported languages.
         Default languages: English, Hindi.
         Note: Urdu (ur) requires a separate reader as it's not compatible with Devnagari (hi) in EasyOCR.
+        `workers` > 1 OCRs pages in a process pool (default: OCR_WORKERS env var, else serial).
         """
         self.languages = languages
+        self.workers = workers or int(os.getenv("OCR_WORKERS", "1"))
         self.readers = {}
-        # Pre-initialize the primary reader
-        self._get_reader(tuple(languages))
-        print(f"OCR Engine initialized for languages: {languages}")
+        self._pool = None
+        # Pre-initialize the primary reader (parallel mode builds one per worker instead)
+        if self.workers <= 1:
+            self._get_reader(tuple(languages))
+        print(f"OCR Engine initialized for languages: {languages} (workers: {self.workers})")
 
     def _get_reader(self, lang_tuple):
         """
@@ -33,49 +70,102 @@ class OCREngine:
                 return self.readers[('en',)]
         return self.readers[lang_tuple]
 
-    def extract_text_from_pdf(self, pdf_path):
+    def _get_pool(self):
+        if self._pool is None:
+            torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+            # spawn, not fork: the pool may start inside the API server, where torch/OpenMP and
+            # thread pools are already running and a forked child can deadlock on their locks
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_ocr_worker,
+                initargs=(list(self.languages), torch_threads)
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _ocr_page(self, page, page_num, text):
+        """
+        Scanned/Image-based or minimal text page - Boost resolution for accuracy
+        """
+        # Zoom factor 2.0 = 144 DPI (Double the default)
+        mat = fitz.Matrix(2, 2)
+        pix = page.get_pixmap(matrix=mat)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+        ocr_results = self._get_reader(tuple(self.languages)).readtext(np.array(img), detail=0)
+        combined_content = text + "\n" + " ".join(ocr_results) if text else " ".join(ocr_results)
+
+        return {
+            "page_number": page_num + 1,
+            "content": combined_content.strip(),
+            "type": "ocr" if not text else "hybrid"
+        }
+
+    def count_pages(self, pdf_path):
+        with fitz.open(pdf_path) as doc:
+            return len(doc)
+
+    def extract_text_from_pdf(self, pdf_path, workers=None):
         """
         Extract text from a PDF. If a page has minimal text, it uses OCR to supplement.
+        With more than one worker, OCR pages are processed in parallel; output order and
+        content are identical to the serial path.
+        """
+        return list(self.iter_pages(pdf_path, workers=workers))
+
+    def iter_pages(self, pdf_path, start_page=0, workers=None):
+        """
+        Yields extracted pages in order, starting at `start_page` (0-based) so an interrupted
+        book can be resumed. At most a few pages per worker are held in memory.
         """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
-            
+
+        workers = workers or self.workers
+        lookahead = max(1, workers * 4)
         doc = fitz.open(pdf_path)
-        output = []
-        print(f"Processing {pdf_path} ({len(doc)} pages)...")
-
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text = page.get_text().strip()
-            
-            # Hybrid Approach: If text is suspiciously short, run OCR
-            if len(text) > 200:
-                output.append({
-                    "page_number": page_num + 1,
-                    "content": text,
-                    "type": "text"
-                })
-            else:
-                # Scanned/Image-based or minimal text page - Boost resolution for accuracy
-                # Zoom factor 2.0 = 144 DPI (Double the default)
-                mat = fitz.Matrix(2, 2)
-                pix = page.get_pixmap(matrix=mat)
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                
-                ocr_results = self._get_reader(tuple(self.languages)).readtext(np.array(img), detail=0)
-                combined_content = text + "\n" + " ".join(ocr_results) if text else " ".join(ocr_results)
-                
-                output.append({
-                    "page_number": page_num + 1,
-                    "content": combined_content.strip(),
-                    "type": "ocr" if not text else "hybrid"
-                })
-                
-            if (page_num + 1) % 5 == 0:
-                print(f"  Processed {page_num + 1}/{len(doc)} pages...")
-
-        doc.close()
-        return output
+        total = len(doc)
+        pending = deque()
+        print(f"Processing {pdf_path} ({total} pages, {workers} OCR workers)...")
+
+        def resolve(item):
+            return item.result() if isinstance(item, Future) else item
+
+        try:
+            for page_num in range(start_page, total):
+                page = doc[page_num]
+                text = page.get_text().strip()
+
+                # Hybrid Approach: If text is suspiciously short, run OCR
+                if len(text) > 200:
+                    pending.append({
+                        "page_number": page_num + 1,
+                        "content": text,
+                        "type": "text"
+                    })
+                elif workers > 1:
+                    pending.append(self._get_pool().submit(_ocr_page_in_worker, pdf_path, page_num, text))
+                else:
+                    pending.append(self._ocr_page(page, page_num, text))
+
+                while len(pending) > lookahead or (pending and not isinstance(pending[0], Future)):
+                    result = resolve(pending.popleft())
+                    if result["page_number"] % 5 == 0:
+                        print(f"  Processed {result['page_number']}/{total} pages...")
+                    yield result
+
+            while pending:
+                yield resolve(pending.popleft())
+        finally:
+            for item in pending:
+                if isinstance(item, Future):
+                    item.cancel()
+            doc.close()
 
     def extract_text_from_image(self, image_path):
         """
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Caches full RAG responses keyed by query embedding similarity within a scope
+    (namespace, filename, detected language), stored in SQLite.
+
+    - A lookup hits when the closest cached query in the same scope has cosine
+      similarity >= `threshold`.
+    - Entries expire after `ttl` seconds; beyond `max_entries` the least recently
+      used are evicted.
+    - Every entry records the version of the scope's source files it was answered against
+      (VectorStoreManager.source_version); entries whose sources were re-indexed, like
+      expired ones, are dropped before the closest query is chosen, so indexing another
+      book does not touch them and a stale neighbour never hides a fresh match.
+    """
+    def __init__(self, db_path="data/answer_cache.db", threshold=0.95, ttl=7 * 24 * 3600, max_entries=20000):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._scopes = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(answers)")]
+            if columns and "version" not in columns:
+                # Entries from before per-source versions were keyed on the global index generation
+                print("Answer cache schema changed. Clearing old answers...")
+                conn.execute("DROP TABLE answers")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    scope TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    response TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_scope ON answers (scope)")
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_access ON answers (last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def scope_key(namespace, filename, lang):
+        return json.dumps([namespace or "*", filename or "*", lang or "*"])
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _load_scope(self, scope):
+        """
+        In-memory (ids, matrix, versions, created) view of one scope, loaded from SQLite on first use.
+        """
+        entry = self._scopes.get(scope)
+        if entry is None:
+            with self._connect() as conn:
+                rows = conn.execute("SELECT id, embedding, version, created FROM answers WHERE scope = ?", (scope,)).fetchall()
+            ids = [row[0] for row in rows]
+            matrix = np.array([np.frombuffer(row[1], dtype=np.float32) for row in rows], dtype=np.float32)
+            entry = {"ids": ids, "matrix": matrix, "versions": [row[2] for row in rows], "created": [row[3] for row in rows]}
+            self._scopes[scope] = entry
+        return entry
+
+    def _drop(self, scope, entry_ids):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in entry_ids])
+        self._scopes.pop(scope, None)
+
+    def lookup(self, embedding, scope, version):
+        """
+        Returns the cached response dict, or None on a miss.
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            entry = self._load_scope(scope)
+            now = time.time()
+            stale = [
+                entry_id for entry_id, entry_version, created in zip(entry["ids"], entry["versions"], entry["created"])
+                if entry_version != version or now - created >= self.ttl
+            ]
+            if stale:
+                # Sources re-indexed or expired
+                self._drop(scope, stale)
+                entry = self._load_scope(scope)
+            if entry["ids"]:
+                scores = entry["matrix"] @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry_id = entry["ids"][best]
+                    with self._connect() as conn:
+                        row = conn.execute("SELECT response, latency FROM answers WHERE id = ?", (entry_id,)).fetchone()
+                        if row:
+                            conn.execute("UPDATE answers SET last_access = ? WHERE id = ?", (now, entry_id))
+                    if row:
+                        self.hits += 1
+                        self.saved_seconds += row[1]
+                        return json.loads(row[0])
+            self.misses += 1
+            return None
+
+    def put(self, query_text, embedding, scope, response, version, latency):
+        vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO answers (scope, query, embedding, response, version, latency, created, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (scope, query_text, vector.tobytes(), json.dumps(response, ensure_ascii=False),
+                     version, latency, now, now)
+                )
+                entry_id = cursor.lastrowid
+            entry = self._scopes.get(scope)
+            if entry is not None:
+                entry["ids"].append(entry_id)
+                entry["matrix"] = np.vstack([entry["matrix"].reshape(-1, len(vector)), vector[None, :]])
+                entry["versions"].append(version)
+                entry["created"].append(now)
+            self._evict(now)
+
+    def _evict(self, now):
+        with self._connect() as conn:
+            expired = conn.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl,)).rowcount
+            overflow = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_access LIMIT ?)",
+                    (overflow,)
+                )
+        if expired or overflow > 0:
+            self._scopes.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            with self._connect() as conn:
+                size = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            return {
+                "size": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "latency_saved_seconds": round(self.saved_seconds, 2),
+                "threshold": self.threshold
+            }
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+
+class ArtifactCache:
+    """
+    Content-addressed store for generated study materials (assessments, mindmaps, summaries), in SQLite.
+
+    The key hashes the artifact kind, namespace, filename, normalized query and the content
+    hashes of the retrieved chunks, so a different context is a different artifact and a
+    cached one stays valid as long as its chunks exist.
+
+    The `chapters` table maps a request (kind, namespace, filename, normalized query) straight
+    to its latest artifact, so pre-generated materials are served without retrieval. Such an
+    entry is only valid for the `version` of its source files (the manifest fingerprint of the
+    namespace/filename, see VectorStoreManager.source_version): indexing another book leaves
+    it untouched, re-indexing the chapter's own file invalidates it.
+    """
+    def __init__(self, db_path="data/artifacts.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(artifacts)")]
+            if columns and "version" not in columns:
+                # Stores from before per-file versions were keyed on the global index generation
+                print("Artifact cache schema changed. Clearing old artifacts...")
+                conn.execute("DROP TABLE artifacts")
+                conn.execute("DROP TABLE IF EXISTS chapters")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    namespace TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    created REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_source ON artifacts (namespace, filename)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chapters (
+                    kind TEXT NOT NULL,
+                    namespace TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    PRIMARY KEY (kind, namespace, filename, query)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def normalize(query):
+        return " ".join(str(query or "").split()).casefold()
+
+    def key(self, kind, namespace, filename, query, chunk_ids):
+        payload = json.dumps([kind, namespace or "*", filename or "*", self.normalize(query), list(chunk_ids)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT content FROM artifacts WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, kind, namespace, filename, query, content, version):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (key, kind, namespace, filename, query, content, version, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, namespace or "*", filename or "*", self.normalize(query),
+                 json.dumps(content, ensure_ascii=False), version, time.time())
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO chapters (kind, namespace, filename, query, key, version) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, namespace or "*", filename or "*", self.normalize(query), key, version)
+            )
+
+    def get_chapter(self, kind, namespace, filename, query, version):
+        """
+        Latest artifact for this request, without retrieval. None if missing or its source files changed.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT a.content FROM chapters c JOIN artifacts a ON a.key = c.key "
+                "WHERE c.kind = ? AND c.namespace = ? AND c.filename = ? AND c.query = ? AND c.version = ?",
+                (kind, namespace or "*", filename or "*", self.normalize(query), version)
+            ).fetchone()
+        with self._lock:
+            if row:
+                self.hits += 1
+        return json.loads(row[0]) if row else None
+
+    def prune(self, current_version):
+        """
+        Deletes the artifacts whose source files changed since they were built.
+        `current_version(namespace, filename)` returns the current version of a source
+        (None for "any"). Returns the number of artifacts deleted.
+        """
+        deleted = 0
+        with self._connect() as conn:
+            sources = conn.execute("SELECT DISTINCT namespace, filename, version FROM artifacts").fetchall()
+            for namespace, filename, version in sources:
+                current = current_version(None if namespace == "*" else namespace, None if filename == "*" else filename)
+                if version == current:
+                    continue
+                params = (namespace, filename, version)
+                conn.execute("DELETE FROM chapters WHERE namespace = ? AND filename = ? AND version = ?", params)
+                deleted += conn.execute(
+                    "DELETE FROM artifacts WHERE namespace = ? AND filename = ? AND version = ?", params
+                ).rowcount
+        return deleted
+
+    def stats(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT kind, COUNT(*) FROM artifacts GROUP BY kind").fetchall()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": dict(rows),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,64 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class BatchScheduler:
+    """
+    Merges concurrent generation requests into batches that share decode steps.
+
+    A single worker thread takes the first waiting request, keeps collecting for up to
+    `window` seconds (or until `max_batch` requests), then calls
+    `generate_batch(prompts, max_new_tokens)` once for the whole group.
+    """
+    def __init__(self, generate_batch, max_batch=4, window=0.02):
+        self.generate_batch = generate_batch
+        self.max_batch = max_batch
+        self.window = window
+        self._requests = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        self._thread = threading.Thread(target=self._run, name="llm-batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt, max_new_tokens=256):
+        future = Future()
+        self._requests.put((prompt, max_new_tokens, future))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._requests.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            prompts = [prompt for prompt, _, _ in batch]
+            max_new_tokens = max(tokens for _, tokens, _ in batch)
+            try:
+                outputs = self.generate_batch(prompts, max_new_tokens)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, _, future), output in zip(batch, outputs):
+                future.set_result(output)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0
+        }
@@ -0,0 +1,63 @@
+import time
+import threading
+
+
+class LazyComponent:
+    """
+    A heavy dependency (embedding model, vector index, LLM, OCR) built on first use.
+
+    get() builds it in the calling thread, or waits if another thread (e.g. the startup
+    warm-up) is already building it. A failed build is retried by the next get().
+    """
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.state = "pending"
+        self.error = None
+        self.load_seconds = None
+        self._value = None
+        self._lock = threading.Lock()
+        self._loaded = threading.Condition(self._lock)
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def get(self):
+        with self._lock:
+            while self.state == "loading":
+                self._loaded.wait()
+            if self.state == "ready":
+                return self._value
+            self.state = "loading"
+
+        started = time.perf_counter()
+        try:
+            value = self.factory()
+        except Exception as e:
+            with self._lock:
+                self.state = "failed"
+                self.error = str(e)
+                self._loaded.notify_all()
+            print(f"Component {self.name} failed to load: {e}")
+            raise
+        with self._lock:
+            self._value = value
+            self.state = "ready"
+            self.error = None
+            self.load_seconds = round(time.perf_counter() - started, 2)
+            self._loaded.notify_all()
+        print(f"Component {self.name} ready in {self.load_seconds}s.")
+        return value
+
+    def warm_up(self):
+        """
+        Like get(), but never raises (for background warm-up).
+        """
+        try:
+            self.get()
+        except Exception:
+            pass
+
+    def status(self):
+        return {"state": self.state, "load_seconds": self.load_seconds, "error": self.error}
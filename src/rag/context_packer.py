@@ -0,0 +1,147 @@
+import os
+import threading
+
+CONTEXT_SEPARATOR = "\n---\n"
+# Per-endpoint token budgets for retrieved context (override with CONTEXT_BUDGET_<ENDPOINT>)
+DEFAULT_BUDGETS = {"chat": 1200, "assessment": 2000, "mindmap": 600, "summary": 2000, "visual": 1000}
+DEFAULT_CONTEXT_TOKENIZER = "Qwen/Qwen2.5-1.5B-Instruct"
+
+
+class ContextPacker:
+    """
+    Assembles retrieved chunks into a prompt context that fits a token budget.
+
+    - Chunks of the same page that overlap (the splitter repeats 100 characters) or directly
+      follow each other are merged into one passage using their `start_index`; exact
+      duplicates are dropped.
+    - Passages are added in relevance order (rank of their best chunk) while they fit the
+      budget; the budget is also capped by the model's context window minus `reserve` tokens
+      for the instructions and the answer.
+    - Tokens are counted with the LLM's tokenizer (CONTEXT_TOKENIZER, loaded on first use),
+      or estimated at ~4 characters per token if it cannot be loaded.
+    """
+    def __init__(self, tokenizer=None, budgets=None, reserve=768, max_gap=5):
+        self.budgets = dict(DEFAULT_BUDGETS)
+        self.budgets.update(budgets or {})
+        for endpoint in list(self.budgets):
+            value = os.getenv(f"CONTEXT_BUDGET_{endpoint.upper()}")
+            if value:
+                self.budgets[endpoint] = int(value)
+        self.reserve = reserve
+        self.max_gap = max_gap
+        self._tokenizer = tokenizer
+        self._tokenizer_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+        self.packed = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    def _get_tokenizer(self):
+        with self._tokenizer_lock:
+            if self._tokenizer is None:
+                try:
+                    from transformers import AutoTokenizer
+                    self._tokenizer = AutoTokenizer.from_pretrained(os.getenv("CONTEXT_TOKENIZER", DEFAULT_CONTEXT_TOKENIZER))
+                except Exception as e:
+                    print(f"Could not load context tokenizer ({e}). Estimating tokens from length.")
+                    self._tokenizer = False
+            return self._tokenizer
+
+    def count_tokens(self, text):
+        tokenizer = self._get_tokenizer()
+        if tokenizer:
+            return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+        return (len(text) + 3) // 4
+
+    def _truncate(self, text, max_tokens):
+        tokenizer = self._get_tokenizer()
+        if tokenizer:
+            ids = tokenizer(text, add_special_tokens=False)["input_ids"][:max_tokens]
+            return tokenizer.decode(ids)
+        return text[:max_tokens * 4]
+
+    def merge(self, docs):
+        """
+        Returns passages as (text, rank, [docs]) with overlapping/adjacent same-page chunks
+        merged, in relevance order.
+        """
+        seen = set()
+        groups = {}
+        loose = []
+        for rank, doc in enumerate(docs):
+            if doc.page_content in seen:
+                continue
+            seen.add(doc.page_content)
+            meta = doc.metadata
+            if "start_index" in meta:
+                groups.setdefault((meta.get("filename"), meta.get("page")), []).append((int(meta["start_index"]), rank, doc))
+            else:
+                loose.append((doc.page_content, rank, [doc]))
+
+        passages = list(loose)
+        for chunks in groups.values():
+            chunks.sort(key=lambda c: c[0])
+            start, rank, doc = chunks[0]
+            text, end, members = doc.page_content, start + len(doc.page_content), [doc]
+            for next_start, next_rank, next_doc in chunks[1:]:
+                next_text = next_doc.page_content
+                if next_start <= end + self.max_gap:
+                    overlap = end - next_start
+                    if overlap >= len(next_text):
+                        pass
+                    elif overlap > 0:
+                        text += next_text[overlap:]
+                    else:
+                        text += " " + next_text
+                    end = max(end, next_start + len(next_text))
+                    rank = min(rank, next_rank)
+                    members.append(next_doc)
+                else:
+                    passages.append((text, rank, members))
+                    text, end, rank, members = next_text, next_start + len(next_text), next_rank, [next_doc]
+            passages.append((text, rank, members))
+        passages.sort(key=lambda p: p[1])
+        return passages
+
+    def budget_for(self, endpoint, context_window=None):
+        budget = self.budgets.get(endpoint, self.budgets["chat"])
+        if context_window:
+            budget = min(budget, max(context_window - self.reserve, 0))
+        return budget
+
+    def pack(self, docs, endpoint="chat", context_window=None):
+        """
+        Returns (context text, docs included). Passages that do not fit are skipped so a
+        smaller, less relevant one can still fill the remaining budget; if not even the most
+        relevant passage fits, it is truncated.
+        """
+        budget = self.budget_for(endpoint, context_window)
+        passages = self.merge(docs)
+        parts, used_docs, used = [], [], 0
+        for text, _, members in passages:
+            tokens = self.count_tokens(text)
+            if used + tokens > budget:
+                if parts:
+                    continue
+                text = self._truncate(text, budget)
+                tokens = budget
+            parts.append(text)
+            used_docs.extend(members)
+            used += tokens
+
+        with self._lock:
+            self.packed += 1
+            self.tokens_in += sum(self.count_tokens(doc.page_content) for doc in docs)
+            self.tokens_out += used
+        return CONTEXT_SEPARATOR.join(parts), used_docs
+
+    def stats(self):
+        with self._lock:
+            return {
+                "packed": self.packed,
+                "retrieved_tokens": self.tokens_in,
+                "context_tokens": self.tokens_out,
+                "reduction": round(1 - self.tokens_out / self.tokens_in, 4) if self.tokens_in else 0.0,
+                "budgets": dict(self.budgets)
+            }
@@ -2,7 +2,7 @@ from optimum.intel import OVModelForCausalLM
 from transformers import AutoTokenizer
 import os
 
-def export_model(model_id="Qwen/Qwen2.5-1.5B-Instruct", save_dir="models/llm_ov"):
+def export_model(model_id="Qwen/Qwen2.5-1.5B-Instruct", save_dir="models/llm_ov", use_cache=True):
     print(f"Exporting {model_id} to OpenVINO format...")
     
     if not os.path.exists(save_dir):
@@ -13,13 +13,15 @@ def export_model(model_id="Qwen/Qwen2.5-1.5B-Instruct", save_dir="models/llm_ov"
     tokenizer.save_pretrained(save_dir)
     
     print("Exporting model to OpenVINO (this will download ~3GB and convert it)...")
-    # Export to OpenVINO
+    # Export to OpenVINO. With use_cache the model is stateful: the KV cache lives inside
+    # the inference request, so each decode step only processes the newest token.
     model = OVModelForCausalLM.from_pretrained(
         model_id, 
         export=True, 
         library_name="transformers", 
-        task="text-generation",
-        use_cache=False
+        task="text-generation-with-past" if use_cache else "text-generation",
+        use_cache=use_cache,
+        stateful=use_cache
     )
     print("Saving OpenVINO model...")
     model.save_pretrained(save_dir)
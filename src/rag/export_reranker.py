@@ -0,0 +1,35 @@
+from optimum.intel import OVModelForSequenceClassification, OVWeightQuantizationConfig
+from transformers import AutoTokenizer
+import os
+from src.rag.reranker import DEFAULT_RERANKER_MODEL
+
+def export_reranker(model_id=DEFAULT_RERANKER_MODEL, save_dir="models/reranker_ov", bits=8):
+    print(f"Exporting {model_id} to OpenVINO format (INT{bits} weights)...")
+
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    print("Saving tokenizer...")
+    tokenizer.save_pretrained(save_dir)
+
+    print("Exporting and quantizing cross-encoder...")
+    model = OVModelForSequenceClassification.from_pretrained(
+        model_id,
+        export=True,
+        quantization_config=OVWeightQuantizationConfig(bits=bits) if bits < 16 else None
+    )
+    print("Saving OpenVINO model...")
+    model.save_pretrained(save_dir)
+
+    print(f"Reranker successfully exported to {save_dir}")
+    print(f"Use it with RERANK_ENABLED=1 RERANKER_MODEL=openvino:{save_dir}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Export the cross-encoder reranker to OpenVINO.")
+    parser.add_argument("--model", default=DEFAULT_RERANKER_MODEL)
+    parser.add_argument("--out", default="models/reranker_ov")
+    parser.add_argument("--bits", type=int, default=8, help="Weight precision (8 = INT8, 16 = keep FP)")
+    args = parser.parse_args()
+    export_reranker(args.model, args.out, args.bits)
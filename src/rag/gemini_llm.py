@@ -3,8 +3,10 @@ import os
 from dotenv import load_dotenv
 
 class GeminiLLM:
-    def __init__(self, model_name="gemini-2.5-flash"):
+    def __init__(self, model_name="gemini-2.5-flash", timeout=30, context_window=1048576):
         load_dotenv()
+        self.timeout = timeout
+        self.context_window = context_window
         self.api_key = os.getenv("GOOGLE_API_KEY")
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY environment variable is not set")
@@ -12,25 +14,53 @@ class GeminiLLM:
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel(model_name)
 
-    def generate(self, prompt):
+    def _request_options(self):
+        return {"timeout": self.timeout} if self.timeout else None
+
+    @staticmethod
+    def _generation_config(schema):
+        # JSON mode; the schema itself is enforced by the caller's validator
+        return {"response_mime_type": "application/json"} if schema else None
+
+    def generate(self, prompt, schema=None):
+        """
+        Errors are raised (not returned as text) so the router can count them and fall back.
+        """
         try:
-            response = self.model.generate_content(prompt)
+            response = self.model.generate_content(
+                prompt,
+                generation_config=self._generation_config(schema),
+                request_options=self._request_options()
+            )
             return response.text
         except Exception as e:
-            return f"Error generating content with Gemini: {e}"
+            raise RuntimeError(f"Gemini failure: {e}")
+
+    def stream(self, prompt, schema=None):
+        """
+        Yields text chunks as Gemini streams them. Errors are raised so the pipeline can fall back.
+        """
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True, generation_config=self._generation_config(schema),
+                                                     request_options=self._request_options()):
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            raise RuntimeError(f"Gemini failure: {e}")
 
-    def generate_from_image(self, prompt, image_path):
+    def generate_from_image(self, prompt, image_path, schema=None):
         """
-        Supports analysis of images (diagrams, math, etc) with a prompt.
+        Supports analysis of images (diagrams, math, etc) with a prompt. Errors are raised like generate().
         """
         try:
             import PIL.Image
             img = PIL.Image.open(image_path)
             # Use 'gemini-1.5-flash' or 'gemini-1.5-pro' for vision
-            response = self.model.generate_content([prompt, img])
+            response = self.model.generate_content([prompt, img], generation_config=self._generation_config(schema),
+                                                   request_options=self._request_options())
             return response.text
         except Exception as e:
-            return f"Error in Vision generation: {e}"
+            raise RuntimeError(f"Gemini Vision failure: {e}")
 
 if __name__ == "__main__":
     # Test
@@ -0,0 +1,418 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+from src.rag.components import LazyComponent
+
+
+class ProviderHealth:
+    """
+    Rolling latency/error statistics and a circuit breaker for one LLM provider.
+
+    The breaker opens after `failure_threshold` consecutive failures and stays open for
+    `cooldown` seconds; then a single trial request is let through (half-open) and its
+    outcome closes or re-opens the breaker.
+    """
+    def __init__(self, name, window=100, failure_threshold=3, cooldown=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self, latency):
+        with self._lock:
+            self.latencies.append(latency)
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            self.state = "closed"
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"Circuit for {self.name} opened after {self.consecutive_failures} consecutive failures.")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def cancel_trial(self):
+        """
+        Gives back a half-open trial slot that was granted but never used.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def percentile(self, q, min_samples=1):
+        with self._lock:
+            if len(self.latencies) < min_samples:
+                return None
+            values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+    def stats(self):
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        with self._lock:
+            errors = self.outcomes.count(False)
+            return {
+                "state": self.state,
+                "requests": len(self.outcomes),
+                "error_rate": round(errors / len(self.outcomes), 4) if self.outcomes else 0.0,
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "consecutive_failures": self.consecutive_failures
+            }
+
+
+class _CallTicket:
+    """
+    Ensures one call's outcome is counted once: by the call itself when it finishes, or
+    by the router when it abandons the call after its timeout.
+    """
+    def __init__(self):
+        self._claimed = False
+        self._lock = threading.Lock()
+
+    def claim(self):
+        with self._lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+            return True
+
+
+class Provider:
+    """
+    One LLM backend behind a LazyComponent. Its concurrency limit and timeout are
+    configured once the LLM is built (they may depend on the instance, e.g. LocalLLM's batch size).
+    """
+    def __init__(self, component, health):
+        self.component = component
+        self.name = component.name
+        self.health = health
+        self.concurrency = None
+        self.limit = None
+        self.timeout = None
+        self.min_interval = 0.0
+        self._next_slot = 0.0
+        self._setup_lock = threading.Lock()
+
+    @property
+    def llm(self):
+        return self.component.get()
+
+    def load(self):
+        llm = self.component.get()
+        with self._setup_lock:
+            if self.limit is None:
+                # Per-backend concurrency limits, e.g. LLM_CONCURRENCY_LOCALLLM=1
+                self.concurrency = int(os.getenv(f"LLM_CONCURRENCY_{self.name.upper()}", getattr(llm, "max_concurrency", 8)))
+                self.timeout = float(os.getenv(f"LLM_TIMEOUT_{self.name.upper()}", getattr(llm, "timeout", None) or 0)) or None
+                if hasattr(llm, "timeout"):
+                    llm.timeout = self.timeout
+                # Optional request rate cap, e.g. LLM_RATE_LIMIT_OPENROUTERLLM=20 (per minute)
+                rate = float(os.getenv(f"LLM_RATE_LIMIT_{self.name.upper()}", "0"))
+                self.min_interval = 60.0 / rate if rate > 0 else 0.0
+                self.limit = threading.BoundedSemaphore(self.concurrency)
+        return llm
+
+    def take_slot(self, timeout=None):
+        """
+        Spaces requests min_interval apart, waiting up to `timeout` seconds (None = as long
+        as needed) for the next free slot. Returns False without reserving a slot if the next
+        one is further away, so the caller can fall back instead of queueing.
+        """
+        if not self.min_interval:
+            return True
+        with self._setup_lock:
+            now = time.monotonic()
+            if now >= self._next_slot:
+                self._next_slot = now + self.min_interval
+                return True
+            delay = self._next_slot - now
+            if timeout is not None and delay > timeout:
+                return False
+            self._next_slot += self.min_interval
+        time.sleep(delay)
+        return True
+
+
+class LLMRouter:
+    """
+    Routes generation requests across LLM providers in priority order.
+
+    - Providers whose circuit breaker is open are skipped without waiting.
+    - LLM_RATE_LIMIT_<CLASS> (requests/minute) spaces calls to rate-limited providers.
+    - Each call is bounded by the provider's timeout (LLM_TIMEOUT_<CLASS>, seconds; 0 = none),
+      which is also passed to the provider's HTTP client.
+    - With hedging enabled (LLM_HEDGE=1), if a call is still running once it passes the
+      provider's LLM_HEDGE_PERCENTILE latency, the next provider is started as well and the
+      first successful answer wins.
+    - A provider that is still loading is skipped while another one is ready, so requests
+      can be served before every model has finished loading.
+    - With a JSON `schema`, providers are asked for schema-constrained output (grammar masks
+      locally, JSON/structured-output modes remotely).
+
+    `llms` are LazyComponents named after the provider class (plain LLM instances are wrapped).
+    """
+    def __init__(self, llms, queue_timeout=30.0):
+        self.queue_timeout = queue_timeout
+        self.hedge = os.getenv("LLM_HEDGE", "0") == "1"
+        self.hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+        self.hedge_min_samples = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+        failure_threshold = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+        cooldown = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+        self.providers = []
+        for llm in llms:
+            if not isinstance(llm, LazyComponent):
+                llm = LazyComponent(llm.__class__.__name__, lambda instance=llm: instance)
+            health = ProviderHealth(llm.name, failure_threshold=failure_threshold, cooldown=cooldown)
+            self.providers.append(Provider(llm, health))
+        # Calls run here so the caller can stop waiting on a slow provider
+        self._pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("LLM_ROUTER_WORKERS", "32")),
+            thread_name_prefix="llm"
+        )
+
+    def ready(self):
+        return any(provider.component.ready for provider in self.providers)
+
+    def context_window(self, default=8192):
+        """
+        Smallest context window among loaded providers, since any of them may answer.
+        """
+        windows = [getattr(p.component.get(), "context_window", default) for p in self.providers if p.component.ready]
+        return min(windows) if windows else default
+
+    def _acquire(self, provider, timeout, fallbacks=()):
+        # Wait for a loading provider only if no loaded provider is left to try after it
+        if not provider.component.ready and any(p.component.ready for p in fallbacks):
+            print(f"Provider {provider.name} is still loading. Skipping...")
+            if provider.component.state == "pending":
+                self._pool.submit(provider.component.warm_up)
+            return False
+        if not provider.health.allow():
+            print(f"Provider {provider.name} circuit is open. Skipping...")
+            return False
+        try:
+            provider.load()
+        except Exception as e:
+            print(f"Provider {provider.name} could not be loaded: {e}. Trying fallback...")
+            provider.health.cancel_trial()
+            return False
+        # The rate-limit wait happens before taking a concurrency slot, and both share `timeout`
+        started = time.monotonic()
+        if not provider.take_slot(timeout):
+            print(f"Provider {provider.name} is at its rate limit. Trying fallback...")
+            provider.health.cancel_trial()
+            return False
+        remaining = max(0.0, timeout - (time.monotonic() - started)) if timeout is not None else None
+        if not provider.limit.acquire(timeout=remaining):
+            print(f"Provider {provider.name} is at its concurrency limit. Trying fallback...")
+            provider.health.cancel_trial()
+            return False
+        return True
+
+    @staticmethod
+    def _options(schema):
+        # Only passed when set, so LLMs without structured output support keep working
+        return {"schema": schema} if schema else {}
+
+    def _call(self, provider, prompt, schema=None, ticket=None, method="generate", args=()):
+        started = time.perf_counter()
+        try:
+            result = getattr(provider.llm, method)(prompt, *args, **self._options(schema))
+        except Exception:
+            # Skipped if the router already counted this call as timed out
+            if ticket is None or ticket.claim():
+                provider.health.record_failure()
+            raise
+        finally:
+            provider.limit.release()
+        if ticket is None or ticket.claim():
+            provider.health.record_success(time.perf_counter() - started)
+        return result
+
+    def generate(self, prompt, schema=None, validate=None):
+        """
+        Returns (text, provider name), or (None, None) if every provider failed or was skipped.
+
+        `validate(text)` may parse or check an answer and returns the value to hand back; if it
+        raises ValueError the answer is discarded and the next provider is tried (this does not
+        count against the provider's health).
+        """
+        remaining = list(self.providers)
+        running = {}
+
+        def launch(hedged=False):
+            while remaining:
+                provider = remaining.pop(0)
+                # A hedge must not queue behind a saturated provider
+                fallbacks = remaining + [p for p, _, _ in running.values()]
+                if not self._acquire(provider, 0 if hedged else self.queue_timeout, fallbacks):
+                    continue
+                if hedged:
+                    print(f"Hedging request to {provider.name}...")
+                ticket = _CallTicket()
+                future = self._pool.submit(self._call, provider, prompt, schema, ticket)
+                running[future] = (provider, time.monotonic(), ticket)
+                return True
+            return False
+
+        launch()
+        while running:
+            now = time.monotonic()
+            deadlines = [started + provider.timeout for provider, started, _ in running.values() if provider.timeout]
+            hedge_at = None
+            if self.hedge and remaining:
+                # Hedge off the most recently started call
+                provider, started, _ = list(running.values())[-1]
+                threshold = provider.health.percentile(self.hedge_percentile, self.hedge_min_samples)
+                if threshold is not None:
+                    hedge_at = started + threshold
+                    deadlines.append(hedge_at)
+            timeout = max(0.0, min(deadlines) - now) if deadlines else None
+
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, _, _ = running.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    print(f"Provider {provider.name} failed: {e}. Trying fallback...")
+                    continue
+                if validate is not None:
+                    try:
+                        text = validate(text)
+                    except ValueError as e:
+                        print(f"Provider {provider.name} returned invalid output: {e}. Trying fallback...")
+                        continue
+                print(f"Text generated using {provider.name}.")
+                return text, provider.name
+
+            now = time.monotonic()
+            for future, (provider, started, ticket) in list(running.items()):
+                if provider.timeout and now - started >= provider.timeout and not future.done():
+                    if not ticket.claim():
+                        # It finished just now; its result is collected on the next pass
+                        continue
+                    # Abandon the call; it finishes in the background and releases its slot,
+                    # but its late outcome is not counted again
+                    print(f"Provider {provider.name} timed out after {provider.timeout:g}s. Trying fallback...")
+                    provider.health.record_failure()
+                    del running[future]
+            if not running:
+                launch()
+            elif hedge_at is not None and now >= hedge_at:
+                launch(hedged=True)
+        return None, None
+
+    def invoke(self, name, method, prompt, *args, schema=None):
+        """
+        One call to `method` of provider `name` (e.g. GeminiLLM's generate_from_image), with
+        no fallback but the same breaker, limits, timeout and health accounting as generate().
+        Raises RuntimeError if the provider is not configured or available, fails or times out.
+        """
+        provider = next((p for p in self.providers if p.name == name), None)
+        if provider is None:
+            raise RuntimeError(f"Provider {name} is not configured")
+        if not self._acquire(provider, self.queue_timeout):
+            raise RuntimeError(f"Provider {name} is not available")
+        ticket = _CallTicket()
+        future = self._pool.submit(self._call, provider, prompt, schema, ticket, method, args)
+        try:
+            return future.result(timeout=provider.timeout)
+        except FutureTimeoutError:
+            if ticket.claim():
+                provider.health.record_failure()
+                raise RuntimeError(f"Provider {name} timed out after {provider.timeout:g}s")
+            # It finished just as the timeout expired
+            return self._result(name, future)
+        except Exception as e:
+            raise RuntimeError(f"Provider {name} failed: {e}") from e
+
+    @staticmethod
+    def _result(name, future):
+        try:
+            return future.result()
+        except Exception as e:
+            raise RuntimeError(f"Provider {name} failed: {e}") from e
+
+    def stream(self, prompt, schema=None, status=None):
+        """
+        Streaming counterpart of generate(). Falls back to the next provider only if one
+        fails before producing its first token; no hedging. Yields text pieces. Closing the
+        generator early (e.g. once a JSON object is complete) ends the provider's request.
+
+        If a `status` dict is given, status["completed"] is set to True (and "provider" to the
+        provider's name) only when a provider finished its answer; a provider failing mid-stream
+        leaves it False, so callers can tell a truncated answer from a complete one.
+        """
+        if status is not None:
+            status["completed"] = False
+        for i, provider in enumerate(self.providers):
+            if not self._acquire(provider, self.queue_timeout, self.providers[i + 1:]):
+                continue
+            started = time.perf_counter()
+            produced = False
+            try:
+                if hasattr(provider.llm, "stream"):
+                    pieces = provider.llm.stream(prompt, **self._options(schema))
+                    try:
+                        for text in pieces:
+                            produced = True
+                            yield text
+                    finally:
+                        pieces.close()
+                else:
+                    text = provider.llm.generate(prompt, **self._options(schema))
+                    produced = True
+                    yield text
+                provider.health.record_success(time.perf_counter() - started)
+                print(f"Text streamed using {provider.name}.")
+                if status is not None:
+                    status.update(completed=True, provider=provider.name)
+                return
+            except GeneratorExit:
+                # The consumer has what it needs; closing before any token says nothing about the provider
+                if produced:
+                    provider.health.record_success(time.perf_counter() - started)
+                else:
+                    provider.health.cancel_trial()
+                raise
+            except Exception as e:
+                provider.health.record_failure()
+                if produced:
+                    print(f"Provider {provider.name} failed mid-stream: {e}")
+                    return
+                print(f"Provider {provider.name} failed: {e}. Trying fallback...")
+            finally:
+                provider.limit.release()
+
+    def stats(self):
+        return {
+            provider.name: dict(provider.health.stats(), timeout=provider.timeout, component=provider.component.state)
+            for provider in self.providers
+        }
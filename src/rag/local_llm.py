@@ -1,12 +1,69 @@
 from optimum.intel import OVModelForCausalLM
-from transformers import AutoTokenizer, pipeline
+from transformers import AutoTokenizer, TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList, pipeline
+from threading import Thread, Lock, Event
+from src.rag.batch_scheduler import BatchScheduler
+from src.rag.structured_output import JSONStreamValidator
 import os
 
+
+class JSONObjectStop(StoppingCriteria):
+    """
+    Stops generation as soon as the generated JSON object closes (or turns out malformed).
+    """
+    def __init__(self, tokenizer, prompt_length):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.validator = JSONStreamValidator()
+        self.decoded = ""
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+        text = self.tokenizer.decode(input_ids[0, self.prompt_length:], skip_special_tokens=True)
+        new_text, self.decoded = text[len(self.decoded):], text
+        try:
+            done = self.validator.feed(new_text)
+        except ValueError:
+            done = True
+        return torch.full((input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device)
+
+
+class CancelStop(StoppingCriteria):
+    """
+    Stops generation once `event` is set (e.g. the stream's reader went away).
+    """
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
 class LocalLLM:
-    def __init__(self, model_id="Qwen/Qwen2.5-1.5B-Instruct", model_dir="models/llm_ov"):
+    def __init__(self, model_id="Qwen/Qwen2.5-1.5B-Instruct", model_dir="models/llm_ov", engine=None, use_cache=None, max_batch=None):
+        """
+        engine: "batched" (default) merges concurrent requests into shared decode steps;
+                "pipeline" runs one HF text-generation pipeline call per request.
+        use_cache: reuse the KV cache across decode steps (requires a stateful export).
+
+        Requests with a JSON `schema` are decoded with token masks from lm-format-enforcer
+        (optional; without it only the early stop applies) and stop once the object closes.
+        They run unbatched, since the masks are per sequence.
+        """
         self.model_id = model_id
         self.model_dir = model_dir
+        self.engine = engine or os.getenv("LOCAL_LLM_ENGINE", "batched")
+        self.use_cache = use_cache if use_cache is not None else os.getenv("LOCAL_LLM_USE_CACHE", "1") == "1"
+        self.max_batch = max_batch or int(os.getenv("LOCAL_LLM_MAX_BATCH", "4"))
+        # Requests the pipeline may send concurrently (only the batched engine benefits from more than one)
+        self.max_concurrency = self.max_batch if self.engine == "batched" else 1
         self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        self.context_window = getattr(self.tokenizer, "model_max_length", 32768)
+        self.model = None
+        self.scheduler = None
+        self._enforcer_data = None
+        # The compiled OpenVINO model holds one inference request; generation calls must not overlap
+        self._model_lock = Lock()
         
         # Check if the OpenVINO model file actually exists
         model_xml = os.path.join(model_dir, "openvino_model.xml")
@@ -15,28 +72,108 @@ class LocalLLM:
             print(f"Warning: OpenVINO model file not found at {model_xml}.")
             print("Please run 'python -m src.rag.export_model' to generate it.")
         else:
-            print(f"Loading OpenVINO model from {model_dir}...")
-            self.model = OVModelForCausalLM.from_pretrained(
-                model_dir, 
-                library_name="transformers",
-                compile=True,
-                use_cache=False
+            print(f"Loading OpenVINO model from {model_dir} (engine: {self.engine}, KV cache: {self.use_cache})...")
+            try:
+                self.model = OVModelForCausalLM.from_pretrained(
+                    model_dir, 
+                    library_name="transformers",
+                    compile=True,
+                    use_cache=self.use_cache
+                )
+            except Exception as e:
+                if not self.use_cache:
+                    raise
+                # Models exported before KV-cache support have no past_key_values inputs
+                print(f"Could not load with KV cache ({e}). Re-export with 'python -m src.rag.export_model'. Falling back to use_cache=False.")
+                self.use_cache = False
+                self.model = OVModelForCausalLM.from_pretrained(
+                    model_dir,
+                    library_name="transformers",
+                    compile=True,
+                    use_cache=False
+                )
+
+            if self.engine == "batched":
+                # Left padding so every prompt in a batch ends at the same position
+                self.tokenizer.padding_side = "left"
+                if self.tokenizer.pad_token is None:
+                    self.tokenizer.pad_token = self.tokenizer.eos_token
+                self.scheduler = BatchScheduler(
+                    self._generate_batch,
+                    max_batch=self.max_batch,
+                    window=float(os.getenv("LOCAL_LLM_BATCH_WINDOW_MS", "20")) / 1000
+                )
+            else:
+                self.pipe = pipeline(
+                    "text-generation",
+                    model=self.model,
+                    tokenizer=self.tokenizer,
+                    max_new_tokens=512,
+                    temperature=0.7,
+                    do_sample=True
+                )
+
+    def _generate_batch(self, prompts, max_new_tokens):
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True)
+        with self._model_lock:
+            outputs = self.model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                temperature=0.7,
+                do_sample=True,
+                pad_token_id=self.tokenizer.pad_token_id
             )
-            
-            self.pipe = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                max_new_tokens=512,
+        new_tokens = outputs[:, inputs["input_ids"].shape[1]:]
+        return [text.strip() for text in self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)]
+
+    def _json_constraints(self, schema, prompt_length):
+        """
+        generate() kwargs that constrain output to `schema`.
+        """
+        kwargs = {"stopping_criteria": StoppingCriteriaList([JSONObjectStop(self.tokenizer, prompt_length)])}
+        try:
+            from lmformatenforcer import JsonSchemaParser
+            from lmformatenforcer.integrations.transformers import (
+                build_token_enforcer_tokenizer_data, build_transformers_prefix_allowed_tokens_fn
+            )
+        except ImportError:
+            return kwargs
+        if self._enforcer_data is None:
+            # Vocabulary prefix tree, built once per tokenizer
+            self._enforcer_data = build_token_enforcer_tokenizer_data(self.tokenizer)
+        kwargs["prefix_allowed_tokens_fn"] = build_transformers_prefix_allowed_tokens_fn(
+            self._enforcer_data, JsonSchemaParser(schema)
+        )
+        return kwargs
+
+    def _generate_json(self, prompt, schema, max_new_tokens):
+        inputs = self.tokenizer(prompt, return_tensors="pt")
+        prompt_length = inputs["input_ids"].shape[1]
+        with self._model_lock:
+            outputs = self.model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
                 temperature=0.7,
-                do_sample=True
+                do_sample=True,
+                pad_token_id=self.tokenizer.pad_token_id or self.tokenizer.eos_token_id,
+                **self._json_constraints(schema, prompt_length)
             )
+        return self.tokenizer.decode(outputs[0, prompt_length:], skip_special_tokens=True).strip()
 
-    def generate(self, prompt):
-        if not hasattr(self, 'pipe'):
-            return "Error: LLM model not loaded. Please run src/rag/export_model.py first."
-            
-        result = self.pipe(prompt, max_new_tokens=256)
+    def generate(self, prompt, max_new_tokens=256, schema=None):
+        if self.model is None:
+            # Raised, not returned as text, so it is never served or cached as an answer
+            raise RuntimeError("LLM model not loaded. Please run src/rag/export_model.py first.")
+
+        if schema:
+            # JSON answers (e.g. a full assessment) are longer; the early stop keeps this cheap
+            return self._generate_json(prompt, schema, max(max_new_tokens, 1024))
+
+        if self.scheduler:
+            return self.scheduler.submit(prompt, max_new_tokens)
+
+        with self._model_lock:
+            result = self.pipe(prompt, max_new_tokens=max_new_tokens)
         generated_text = result[0]['generated_text']
         
         # Clean up: strip the prompt from the result if present
@@ -45,6 +182,59 @@ class LocalLLM:
             
         return generated_text
 
+    def stream(self, prompt, max_new_tokens=256, schema=None):
+        """
+        Yields decoded text as tokens are generated (generation runs on a background thread).
+        Streams are not batched and hold the model while generating, but not while the
+        caller reads: a slow reader only drains the streamer's queue. Closing the generator
+        stops generation at the next token.
+        """
+        if self.model is None:
+            raise RuntimeError("LLM model not loaded. Please run src/rag/export_model.py first.")
+
+        inputs = self.tokenizer(prompt, return_tensors="pt")
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        cancelled = Event()
+        stopping = StoppingCriteriaList([CancelStop(cancelled)])
+        constraints = {}
+        if schema:
+            max_new_tokens = max(max_new_tokens, 1024)
+            constraints = self._json_constraints(schema, inputs["input_ids"].shape[1])
+            stopping.extend(constraints.pop("stopping_criteria"))
+        errors = []
+
+        def run():
+            try:
+                with self._model_lock:
+                    if not cancelled.is_set():
+                        self.model.generate(
+                            **inputs,
+                            streamer=streamer,
+                            max_new_tokens=max_new_tokens,
+                            temperature=0.7,
+                            do_sample=True,
+                            pad_token_id=self.tokenizer.eos_token_id,
+                            stopping_criteria=stopping,
+                            **constraints
+                        )
+                        return
+            except Exception as e:
+                errors.append(e)
+            # Unblocks the reader when generation failed or never started
+            streamer.end()
+
+        thread = Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        finally:
+            cancelled.set()
+            thread.join()
+        if errors:
+            raise RuntimeError(f"Local generation failed: {errors[0]}")
+
 if __name__ == "__main__":
     # Example usage
     # llm = LocalLLM()
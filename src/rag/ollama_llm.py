@@ -3,21 +3,56 @@ import json
 import os
 
 class OllamaLLM:
-    def __init__(self, model_name="qwen2.5"):
+    def __init__(self, model_name="qwen2.5", timeout=60, context_window=2048):
         self.base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/api/generate")
         self.model_name = model_name
+        # Ollama's default num_ctx
+        self.context_window = context_window
+        self.timeout = timeout
 
-    def generate(self, prompt):
+    def generate(self, prompt, schema=None):
+        """
+        With a JSON `schema`, Ollama constrains decoding to objects matching it.
+        """
         try:
             payload = {
                 "model": self.model_name,
                 "prompt": prompt,
                 "stream": False
             }
-            response = requests.post(self.base_url, json=payload)
+            if schema:
+                payload["format"] = schema
+            response = requests.post(self.base_url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             result = response.json()
-            return result.get("response", "Error: No response from Ollama")
+            if "response" not in result:
+                raise ValueError("No response from Ollama")
+            return result["response"]
+        except Exception as e:
+            raise RuntimeError(f"Ollama failure: {e}")
+
+    def stream(self, prompt, schema=None):
+        """
+        Yields response tokens as Ollama produces them (newline-delimited JSON).
+        """
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": True
+        }
+        if schema:
+            payload["format"] = schema
+        try:
+            with requests.post(self.base_url, json=payload, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
         except Exception as e:
             raise RuntimeError(f"Ollama failure: {e}")
 
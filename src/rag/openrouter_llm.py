@@ -3,21 +3,32 @@ import requests
 import json
 
 class OpenRouterLLM:
-    def __init__(self, model_name="qwen/qwen3-4b:free", api_key=None):
+    def __init__(self, model_name="qwen/qwen3-4b:free", api_key=None, timeout=30, context_window=40960):
         self.model_name = model_name
+        self.context_window = context_window
+        # Seconds for connecting and between received bytes (None waits forever)
+        self.timeout = timeout
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
         
         if not self.api_key:
             print("Warning: OPENROUTER_API_KEY is not set.")
 
-    def generate(self, prompt):
-        headers = {
+    def _headers(self):
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "HTTP-Referer": "http://localhost:3000",
             "X-Title": "NCERT Solver",
         }
+
+    @staticmethod
+    def _response_format(schema):
+        # Structured outputs; models without support fall back to plain JSON in the prompt
+        return {"type": "json_schema", "json_schema": {"name": schema.get("title", "response"), "schema": schema}}
+
+    def generate(self, prompt, schema=None):
+        headers = self._headers()
         
         payload = {
             "model": self.model_name,
@@ -28,16 +39,17 @@ class OpenRouterLLM:
             "max_tokens": 1000,
             # "provider": { "ignore": ["Venice"] } # Optional: ignore specific providers if they are problematic
         }
+        if schema:
+            payload["response_format"] = self._response_format(schema)
         
         try:
-            response = requests.post(self.base_url, headers=headers, json=payload)
+            response = requests.post(self.base_url, headers=headers, json=payload, timeout=self.timeout)
             response.raise_for_status()
             result = response.json()
             # OpenRouter standard OpenAI-compatible response format
             if "choices" in result and len(result["choices"]) > 0:
                 return result["choices"][0]["message"]["content"]
-            else:
-                return f"Error: Unexpected response format from OpenRouter: {result}"
+            raise ValueError(f"Unexpected response format from OpenRouter: {result}")
         except Exception as e:
             # Basic error handling
             # If response has detailed error message, try to extract it
@@ -49,6 +61,38 @@ class OpenRouterLLM:
                 pass
             raise RuntimeError(f"OpenRouter failure: {error_msg}")
 
+    def stream(self, prompt, schema=None):
+        """
+        Yields content deltas from OpenRouter's server-sent event stream.
+        """
+        payload = {
+            "model": self.model_name,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 1000,
+            "stream": True
+        }
+        if schema:
+            payload["response_format"] = self._response_format(schema)
+        try:
+            with requests.post(self.base_url, headers=self._headers(), json=payload, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    # Skip keep-alive comments (": OPENROUTER PROCESSING") and blank lines
+                    if not line or not line.startswith("data: "):
+                        continue
+                    data = line[len("data: "):]
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    choices = chunk.get("choices") or []
+                    if choices and choices[0].get("delta", {}).get("content"):
+                        yield choices[0]["delta"]["content"]
+        except Exception as e:
+            raise RuntimeError(f"OpenRouter failure: {e}")
+
 if __name__ == "__main__":
     # Test
     # llm = OpenRouterLLM()
@@ -1,63 +1,190 @@
 import os
+import time
 import langdetect
 from src.ingestion.vector_store import VectorStoreManager
+from src.rag.answer_cache import SemanticAnswerCache
+from src.rag.llm_router import LLMRouter
+from src.rag.components import LazyComponent
+from src.rag.context_packer import ContextPacker
+from src.rag.structured_output import parse_json
+
+NO_CONTEXT_ANSWER = "I am sorry, but I don't have information about that in my NCERT knowledge base."
+OFFLINE_ANSWER = "I am sorry, but all my AI brains are currently offline."
+
+def _openrouter_llm():
+    from src.rag.openrouter_llm import OpenRouterLLM
+    return OpenRouterLLM(model_name="qwen/qwen3-4b:free")
+
+def _gemini_llm():
+    from src.rag.gemini_llm import GeminiLLM
+    return GeminiLLM()
+
+def _local_llm():
+    from src.rag.local_llm import LocalLLM
+    return LocalLLM()
+
+def _reranker():
+    from src.rag.reranker import CrossEncoderReranker
+    return CrossEncoderReranker(budget_ms=float(os.getenv("RERANK_BUDGET_MS", "150")))
 
 class RAGPipeline:
+    """
+    Heavy components (retrieval: embedding model + vector index; each LLM) are built lazily
+    on first use, or all at once in parallel by warm_up().
+    """
     def __init__(self):
-        self.vector_store = VectorStoreManager()
+        self.retrieval = LazyComponent("retrieval", VectorStoreManager)
+
+        # Semantic answer cache for repeated questions (ANSWER_CACHE_ENABLED=0 to disable)
+        self.answer_cache = None
+        if os.getenv("ANSWER_CACHE_ENABLED", "1") == "1":
+            self.answer_cache = SemanticAnswerCache(
+                db_path=os.getenv("ANSWER_CACHE_PATH", "data/answer_cache.db"),
+                threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+                ttl=float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600))),
+                max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "20000"))
+            )
         
-        # Priority: Ollama -> Gemini -> Local
-        self.llms = []
+        # Priority: OpenRouter -> Gemini -> Local
+        llm_components = []
         
         openrouter_key = os.getenv("OPENROUTER_API_KEY")
         if openrouter_key:
-             from src.rag.openrouter_llm import OpenRouterLLM
-             self.llms.append(OpenRouterLLM(model_name="qwen/qwen3-4b:free"))
+             llm_components.append(LazyComponent("OpenRouterLLM", _openrouter_llm))
              print("OpenRouter (qwen/qwen3-4b:free) added to pipeline.")
 
         # ollama_model = os.getenv("OLLAMA_MODEL")
         # if ollama_model:
         #     from src.rag.ollama_llm import OllamaLLM
-        #     self.llms.append(OllamaLLM(model_name=ollama_model))
+        #     llm_components.append(LazyComponent("OllamaLLM", lambda: OllamaLLM(model_name=ollama_model)))
         #     print(f"Ollama ({ollama_model}) added to pipeline.")
 
         google_api_key = os.getenv("GOOGLE_API_KEY")
         if google_api_key:
-            from src.rag.gemini_llm import GeminiLLM
-            self.llms.append(GeminiLLM())
+            llm_components.append(LazyComponent("GeminiLLM", _gemini_llm))
             print("Gemini API added to pipeline.")
 
         # Always add local as ultra-fallback if nothing else works
-        try:
-            from src.rag.local_llm import LocalLLM
-            self.llms.append(LocalLLM())
-            print("Local LLM added as fallback.")
-        except Exception as e:
-            print(f"Could not initialize local LLM: {e}")
-        
+        llm_components.append(LazyComponent("LocalLLM", _local_llm))
+        print("Local LLM added as fallback.")
+
+        # Optional cross-encoder rerank stage over an over-fetched candidate set (RERANK_ENABLED=1)
+        self.reranker = LazyComponent("reranker", _reranker) if os.getenv("RERANK_ENABLED", "0") == "1" else None
+        self.rerank_candidates = int(os.getenv("RERANK_CANDIDATES", "20"))
+        self.rerank_max_tokens = int(os.getenv("RERANK_MAX_TOKENS", "1500"))
+
+        # Token-budgeted context assembly (CONTEXT_BUDGET_<ENDPOINT>)
+        self.context_packer = ContextPacker()
+
+        # Health-aware routing: per-provider limits, timeouts, circuit breakers, optional hedging
+        self.router = LLMRouter(llm_components, queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "30")))
+
+    @property
+    def vector_store(self):
+        return self.retrieval.get()
+
+    @property
+    def llms(self):
+        """
+        LLM instances that have finished loading, in priority order.
+        """
+        return [provider.llm for provider in self.router.providers if provider.component.ready]
+
+    def components(self):
+        components = [self.retrieval] + [provider.component for provider in self.router.providers]
+        if self.reranker is not None:
+            components.append(self.reranker)
+        return components
+
+    def warm_up(self, executor):
+        """
+        Starts building every component concurrently on `executor`. Returns the futures.
+        """
+        return [executor.submit(component.warm_up) for component in self.components()]
+
+    def ready(self):
+        """
+        True once /chat can be served: retrieval and at least one LLM are loaded.
+        """
+        return self.retrieval.ready and self.router.ready()
+
     def generate_text(self, prompt):
         """
         Helper to generate text using the available LLM chain with full fallback.
         """
-        for llm in self.llms:
-            try:
-                response = llm.generate(prompt)
-                print(f"Text generated using {llm.__class__.__name__}.")
-                return response
-            except Exception as e:
-                print(f"Provider {llm.__class__.__name__} failed: {e}. Trying fallback...")
-                continue
-        return "I am sorry, but all my AI brains are currently offline."
+        text, _ = self.router.generate(prompt)
+        return text if text is not None else OFFLINE_ANSWER
 
-    def generate_response(self, query, grade=None, subject=None, filename=None):
+    def generate_json(self, prompt, schema):
         """
-        Full RAG flow: Retrieve -> Augment -> Generate
+        Generates one JSON object matching `schema` (JSON Schema), with schema-constrained
+        decoding where the provider supports it (constrained providers, and LocalLLM's
+        JSON stopping criterion, end generation when the object closes). An answer that is not
+        a valid object falls back to the next provider, with the usual timeouts and hedging.
+        Raises ValueError if no provider produced one.
         """
-        # 1. Detection & Filtering
+        result, _ = self.router.generate(prompt, schema=schema, validate=lambda text: parse_json(text, schema))
+        if result is None:
+            raise ValueError("No provider produced a valid JSON object")
+        return result
+
+    def stream_text(self, prompt, status=None):
+        """
+        Streaming counterpart of generate_text(). Falls back to the next provider only
+        if one fails before producing its first token. See LLMRouter.stream for `status`.
+        """
+        produced = False
+        for text in self.router.stream(prompt, status=status):
+            produced = True
+            yield text
+        if not produced:
+            yield OFFLINE_ANSWER
+
+    def detect_language(self, query):
         try:
-            lang = langdetect.detect(query)
+            return langdetect.detect(query)
         except:
-            lang = "en"
+            return "en"
+
+    def _namespace(self, subject, grade):
+        if subject and grade:
+            return f"{subject}_{grade}".replace(" ", "_")
+        return None
+
+    def search(self, query, namespace=None, k=3, filter=None, max_tokens=None):
+        """
+        Vector search, followed by the rerank stage when it is enabled: RERANK_CANDIDATES chunks
+        are fetched, re-scored, and the best `k` within `max_tokens` (RERANK_MAX_TOKENS) are kept.
+        While the reranker is still loading (or failed to load) plain search results are returned.
+        """
+        reranker = None
+        if self.reranker is not None and self.reranker.state in ("pending", "ready"):
+            try:
+                reranker = self.reranker.get()
+            except Exception:
+                reranker = None
+        if reranker is None:
+            return self.vector_store.search(query, namespace=namespace, k=k, filter=filter)
+
+        candidates = self.vector_store.search(query, namespace=namespace, k=max(k, self.rerank_candidates), filter=filter)
+        started = time.perf_counter()
+        reranked = reranker.rerank(query, candidates, top_n=k, max_tokens=max_tokens or self.rerank_max_tokens)
+        print(f"Reranked {len(candidates)} candidates to {len(reranked)} in {(time.perf_counter() - started) * 1000:.0f} ms.")
+        return [doc for doc, _ in reranked]
+
+    def pack_context(self, docs, endpoint="chat"):
+        """
+        Merges overlapping chunks and fills the endpoint's token budget by relevance.
+        Returns (context text, docs included).
+        """
+        return self.context_packer.pack(docs, endpoint=endpoint, context_window=self.router.context_window())
+
+    def retrieve(self, query, grade=None, subject=None, filename=None, k=3):
+        """
+        Language detection + retrieval. Returns (lang, docs).
+        """
+        # 1. Detection & Filtering
+        lang = self.detect_language(query)
             
         filters = {}
         if filename:
@@ -65,20 +192,64 @@ class RAGPipeline:
         
         # 2. Retrieval
         print(f"Querying Knowledge Base: '{query}'...")
-        subject_grade_namespace = None
-        if subject and grade:
-            subject_grade_namespace = f"{subject}_{grade}".replace(" ", "_")
+        subject_grade_namespace = self._namespace(subject, grade)
         
-        docs = self.vector_store.search(query, namespace=subject_grade_namespace, k=3, filter=filters if filters else None)
+        docs = self.search(query, namespace=subject_grade_namespace, k=k, filter=filters if filters else None)
         print(f"Found {len(docs)} relevant context blocks.")
+        return lang, docs
+
+    def _cache_lookup(self, query, grade, subject, filename):
+        """
+        Returns (cached response or None, cache context for _cache_store).
+        """
+        if not self.answer_cache:
+            return None, None
+        lang = self.detect_language(query)
+        namespace = self._namespace(subject, grade)
+        scope = self.answer_cache.scope_key(namespace, filename, lang)
+        # Same cached embedding the retrieval step uses, so a miss costs no extra encoder pass
+        embedding = self.vector_store.query_embeddings.embed_query(query)
+        # Only re-indexing the scope's own sources invalidates its answers
+        version = self.vector_store.source_version(namespace, filename)
+        cached = self.answer_cache.lookup(embedding, scope, version)
+        return cached, (query, embedding, scope, version)
+
+    def _cache_store(self, context, response, latency):
+        if context and response.get("citations"):
+            query, embedding, scope, version = context
+            self.answer_cache.put(query, embedding, scope, response, version, latency)
+
+    def _citations(self, docs):
+        citations = []
+        for doc in docs:
+            citations.append({
+                "source": doc.metadata.get("filename", "Unknown"),
+                "page": doc.metadata.get("page", "?"),
+                "grade": doc.metadata.get("grade", "?"),
+                "subject": doc.metadata.get("subject", "?")
+            })
+        return citations
+
+    def generate_response(self, query, grade=None, subject=None, filename=None):
+        """
+        Full RAG flow: Retrieve -> Augment -> Generate
+        Answers to (semantically) repeated questions are served from the answer cache.
+        """
+        started = time.perf_counter()
+        cached, cache_context = self._cache_lookup(query, grade, subject, filename)
+        if cached:
+            print("Answer served from semantic cache.")
+            return cached
+
+        lang, docs = self.retrieve(query, grade=grade, subject=subject, filename=filename)
         
         if not docs:
             return {
-                "answer": "I am sorry, but I don't have information about that in my NCERT knowledge base.",
+                "answer": NO_CONTEXT_ANSWER,
                 "citations": []
             }
             
-        context = "\n---\n".join([doc.page_content for doc in docs])
+        context, docs = self.pack_context(docs)
         
         # 3. Augmentation (Prompt Engineering)
         prompt = self._build_prompt(query, context, lang)
@@ -89,20 +260,62 @@ class RAGPipeline:
         print("Response generated.")
         
         # 5. Citations
-        citations = []
-        for doc in docs:
-            citations.append({
-                "source": doc.metadata.get("filename", "Unknown"),
-                "page": doc.metadata.get("page", "?"),
-                "grade": doc.metadata.get("grade", "?"),
-                "subject": doc.metadata.get("subject", "?")
-            })
-            
-        return {
+        response = {
             "answer": response_text,
-            "citations": citations,
+            "citations": self._citations(docs),
             "detected_language": lang
         }
+        if response_text != OFFLINE_ANSWER:
+            self._cache_store(cache_context, response, time.perf_counter() - started)
+        return response
+
+    def stream_response(self, query, grade=None, subject=None, filename=None):
+        """
+        Streaming RAG flow. Yields (event, data) pairs: "citations" first, then "token"
+        events as text arrives, then "done" with time-to-first-token and total latency.
+        """
+        started = time.perf_counter()
+        cached, cache_context = self._cache_lookup(query, grade, subject, filename)
+        if cached:
+            yield "citations", {"citations": cached["citations"], "detected_language": cached.get("detected_language")}
+            yield "token", cached["answer"]
+            elapsed = round((time.perf_counter() - started) * 1000, 1)
+            yield "done", {"ttft_ms": elapsed, "total_ms": elapsed, "chunks": 1, "cached": True}
+            return
+
+        lang, docs = self.retrieve(query, grade=grade, subject=subject, filename=filename)
+        context, docs = self.pack_context(docs) if docs else ("", [])
+        citations = self._citations(docs)
+        yield "citations", {"citations": citations, "detected_language": lang}
+
+        if not docs:
+            yield "token", NO_CONTEXT_ANSWER
+            yield "done", {"ttft_ms": None, "total_ms": round((time.perf_counter() - started) * 1000, 1), "chunks": 1}
+            return
+
+        prompt = self._build_prompt(query, context, lang)
+
+        ttft = None
+        parts = []
+        status = {}
+        for text in self.stream_text(prompt, status=status):
+            if ttft is None:
+                ttft = time.perf_counter() - started
+                print(f"Time to first token: {ttft * 1000:.0f} ms")
+            parts.append(text)
+            yield "token", text
+
+        total = time.perf_counter() - started
+        chunks = len(parts)
+        answer = "".join(parts)
+        # A provider that failed mid-stream leaves a truncated answer; never cache it
+        if status.get("completed"):
+            self._cache_store(cache_context, {"answer": answer, "citations": citations, "detected_language": lang}, total)
+        yield "done", {
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            "total_ms": round(total * 1000, 1),
+            "chunks": chunks
+        }
 
     def _build_prompt(self, query, context, lang):
         # Map detected language codes to full names for better LLM instruction
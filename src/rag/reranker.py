@@ -0,0 +1,144 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from src.ingestion.index_manifest import content_hash
+
+# Multilingual (the corpus has Hindi books); ms-marco-MiniLM-L-6-v2 is a smaller English-only option
+DEFAULT_RERANKER_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores retrieved chunks against the query with a small cross-encoder on CPU.
+
+    - Model spec: "openvino:<dir>" (INT8 export, see src/rag/export_reranker.py), a directory
+      holding openvino_model.xml, or a Hugging Face model id (PyTorch, dynamically quantized to INT8).
+    - Candidates are scored in batches in retrieval order until the latency budget is spent;
+      anything left unscored keeps its retrieval order behind the scored chunks.
+    - (query, chunk) scores are kept in an LRU cache, so repeated questions cost nothing.
+    """
+    def __init__(self, model_spec=None, batch_size=16, max_length=256, cache_size=20000, budget_ms=150):
+        from transformers import AutoTokenizer
+
+        model_spec = model_spec or os.getenv("RERANKER_MODEL") or DEFAULT_RERANKER_MODEL
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self.budget = budget_ms / 1000 if budget_ms else None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.scored = 0
+        self.cache_hits = 0
+        self.budget_exhausted = 0
+
+        model_dir = model_spec.split(":", 1)[1] if model_spec.startswith("openvino:") else model_spec
+        if os.path.exists(os.path.join(model_dir, "openvino_model.xml")):
+            from optimum.intel import OVModelForSequenceClassification
+            print(f"Loading OpenVINO reranker from {model_dir}...")
+            self.model = OVModelForSequenceClassification.from_pretrained(model_dir, compile=True)
+            self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+            self.backend = "openvino"
+        else:
+            import torch
+            from transformers import AutoModelForSequenceClassification
+            print(f"Loading reranker {model_spec} (PyTorch, dynamic INT8)...")
+            model = AutoModelForSequenceClassification.from_pretrained(model_spec).eval()
+            self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.tokenizer = AutoTokenizer.from_pretrained(model_spec)
+            self.backend = "torch"
+
+    def _score_batch(self, query, texts):
+        inputs = self.tokenizer(
+            [query] * len(texts), texts, padding=True, truncation="only_second",
+            max_length=self.max_length, return_tensors="pt" if self.backend == "torch" else "np"
+        )
+        if self.backend == "torch":
+            import torch
+            with torch.no_grad():
+                logits = self.model(**inputs).logits.numpy()
+        else:
+            logits = np.asarray(self.model(**inputs).logits)
+        # Single relevance logit, or the "relevant" class of a two-class head
+        return logits[:, 0] if logits.shape[1] == 1 else logits[:, -1]
+
+    def _cache_key(self, query, doc):
+        return (" ".join(query.split()).casefold(), content_hash(doc.page_content))
+
+    def score(self, query, docs, budget=None):
+        """
+        Returns one score per doc, or None for docs the latency budget did not reach.
+        """
+        budget = self.budget if budget is None else budget
+        started = time.perf_counter()
+        scores = [None] * len(docs)
+        todo = []
+        with self._lock:
+            self.requests += 1
+            for i, doc in enumerate(docs):
+                key = self._cache_key(query, doc)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+                    self.cache_hits += 1
+                else:
+                    todo.append((i, key))
+
+        for start in range(0, len(todo), self.batch_size):
+            if budget is not None and start and time.perf_counter() - started > budget:
+                with self._lock:
+                    self.budget_exhausted += 1
+                break
+            batch = todo[start:start + self.batch_size]
+            values = self._score_batch(query, [docs[i].page_content for i, _ in batch])
+            with self._lock:
+                for (i, key), value in zip(batch, values):
+                    scores[i] = float(value)
+                    self._cache[key] = scores[i]
+                self.scored += len(batch)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def count_tokens(self, text):
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def rerank(self, query, docs, top_n=3, max_tokens=None, budget=None):
+        """
+        Returns up to `top_n` (Document, score) pairs, best first. With `max_tokens` the set is
+        filled in rank order with chunks whose combined token count stays within it (the best
+        chunk is always kept). Unscored docs have score None.
+        """
+        if not docs:
+            return []
+        scores = self.score(query, docs, budget=budget)
+        scored = sorted((i for i in range(len(docs)) if scores[i] is not None), key=lambda i: -scores[i])
+        order = scored + [i for i in range(len(docs)) if scores[i] is None]
+
+        results = []
+        used = 0
+        for i in order:
+            if len(results) == top_n:
+                break
+            if max_tokens is not None:
+                tokens = self.count_tokens(docs[i].page_content)
+                # Skip chunks that do not fit; a smaller, lower-ranked one still might
+                if results and used + tokens > max_tokens:
+                    continue
+                used += tokens
+            results.append((docs[i], scores[i]))
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "scored": self.scored,
+                "cache_hits": self.cache_hits,
+                "cache_size": len(self._cache),
+                "budget_exhausted": self.budget_exhausted,
+                "backend": self.backend
+            }
@@ -0,0 +1,113 @@
+import json
+
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+def check_schema(value, schema, path="$"):
+    """
+    Validates `value` against the subset of JSON Schema used for our prompts: type,
+    properties, required, items, minItems and enum. Raises ValueError on the first mismatch.
+    """
+    expected = schema.get("type")
+    if expected:
+        python_type = _JSON_TYPES[expected]
+        # bool is an int in Python, but not a JSON number
+        if not isinstance(value, python_type) or (isinstance(value, bool) and expected != "boolean"):
+            raise ValueError(f"{path}: expected {expected}, got {type(value).__name__}")
+    if "enum" in schema and value not in schema["enum"]:
+        raise ValueError(f"{path}: {value!r} is not one of {schema['enum']}")
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                raise ValueError(f"{path}: missing '{key}'")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                check_schema(value[key], subschema, f"{path}.{key}")
+    if isinstance(value, list):
+        if len(value) < schema.get("minItems", 0):
+            raise ValueError(f"{path}: expected at least {schema['minItems']} items, got {len(value)}")
+        if "items" in schema:
+            for i, item in enumerate(value):
+                check_schema(item, schema["items"], f"{path}[{i}]")
+
+
+class JSONStreamValidator:
+    """
+    Incremental scanner for one JSON object in streamed LLM output.
+
+    feed() consumes text as it arrives and returns True as soon as the top-level object
+    closes, so the caller can stop generation there. Text before the opening brace (code
+    fences, a preamble) and after the closing one is ignored. Mismatched brackets raise
+    ValueError immediately instead of waiting for the rest of a broken answer.
+    """
+    def __init__(self):
+        self.parts = []
+        self.stack = []
+        self.started = False
+        self.complete = False
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, text):
+        if self.complete or not text:
+            return self.complete
+        start = 0
+        if not self.started:
+            start = text.find("{")
+            if start == -1:
+                return False
+            self.started = True
+        for i in range(start, len(text)):
+            ch = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.stack.append("}" if ch == "{" else "]")
+            elif ch in "}]":
+                if not self.stack or self.stack.pop() != ch:
+                    raise ValueError(f"Malformed JSON: unexpected '{ch}'")
+                if not self.stack:
+                    self.parts.append(text[start:i + 1])
+                    self.complete = True
+                    return True
+        self.parts.append(text[start:])
+        return False
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    def value(self, schema=None):
+        """
+        The parsed object, checked against `schema` if given. Raises ValueError if the
+        object is incomplete, not valid JSON or does not match.
+        """
+        if not self.complete:
+            raise ValueError("Incomplete JSON object in response")
+        result = json.loads(self.text)
+        if schema:
+            check_schema(result, schema)
+        return result
+
+
+def parse_json(text, schema=None):
+    """
+    Extracts and validates the first JSON object in a complete response.
+    """
+    validator = JSONStreamValidator()
+    validator.feed(text)
+    return validator.value(schema)
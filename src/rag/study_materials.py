@@ -0,0 +1,234 @@
+import re
+from src.ingestion.index_manifest import content_hash
+from src.rag.rag_pipeline import OFFLINE_ANSWER
+
+
+class NoContentError(Exception):
+    """
+    Raised when retrieval finds nothing to build study material from.
+    """
+
+
+ASSESSMENT_SCHEMA = {
+    "title": "assessment",
+    "type": "object",
+    "properties": {
+        "topic": {"type": "string"},
+        "flashcards": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {"q": {"type": "string"}, "a": {"type": "string"}},
+                "required": ["q", "a"]
+            }
+        },
+        "quiz": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "q": {"type": "string"},
+                    "options": {"type": "array", "items": {"type": "string"}, "minItems": 2},
+                    "correct": {"type": "string"}
+                },
+                "required": ["q", "options", "correct"]
+            }
+        }
+    },
+    "required": ["topic", "flashcards", "quiz"]
+}
+
+
+def clean_mindmap(raw_response, query):
+    """
+    Turns an LLM response into a Mermaid mindmap script. Returns (script, valid) where
+    `valid` is False if the response had to be converted from an outline.
+    """
+    raw_text = raw_response.strip()
+
+    # 1. Extract code block if present
+    match = re.search(r"```(?:mermaid)?(.*?)```", raw_text, re.DOTALL)
+    if match:
+        raw_text = match.group(1).strip()
+
+    # 2. Check if valid mermaid
+    if raw_text.startswith("mindmap"):
+        return raw_text, True
+
+    # FALLBACK: Convert structured text/outline to Mindmap
+    lines = [l for l in raw_text.split('\n') if l.strip()]
+    clean_lines = ["mindmap", f'  root(("{query}"))']
+    for line in lines:
+        stripped = line.lstrip()
+        # Calculate indent level (2 spaces = 1 level approx)
+        level = ((len(line) - len(stripped)) // 2) + 2 # Base indent is 2
+
+        # Remove bullets, escape quotes and parens which break mermaid, limit length
+        content = re.sub(r"^[-*•0-9.]+\s*", "", stripped)
+        content = content.replace('"', "'").replace("(", "[").replace(")", "]")
+        if len(content) > 50: content = content[:47] + "..."
+        if not content: continue
+
+        # Mermaid needs at least 2 spaces indent
+        clean_lines.append(f"{' ' * max(4, level * 2)}{content}")
+    return "\n".join(clean_lines), False
+
+
+KINDS = ("assessment", "mindmap", "summary")
+
+
+class StudyMaterials:
+    """
+    Generates chapter assessments, mindmaps and summaries, serving repeats from the
+    ArtifactCache. A request seen before (or pre-generated by src/ingestion/pregenerate_materials.py)
+    is answered from the store without retrieval. Only validated output is cached.
+    """
+    def __init__(self, pipeline, artifacts):
+        self.pipeline = pipeline
+        self.artifacts = artifacts
+
+    def _retrieve(self, query, subject, grade, filename, k):
+        namespace = self.pipeline._namespace(subject, grade)
+        filters = {"filename": filename} if filename else None
+        docs = self.pipeline.search(query, namespace=namespace, k=k, filter=filters)
+        if not docs:
+            # Fallback: if no specific query matches, just get general subject context
+            docs = self.pipeline.search(subject or "NCERT", namespace=namespace, k=k, filter=filters)
+        return namespace, docs
+
+    def cached(self, kind, query, subject=None, grade=None, filename=None):
+        """
+        The stored artifact for this request, or None.
+        """
+        namespace = self.pipeline._namespace(subject, grade)
+        version = self.pipeline.vector_store.source_version(namespace, filename)
+        return self.artifacts.get_chapter(kind, namespace, filename, query, version)
+
+    def _cached(self, kind, query, subject, grade, filename, k, build, refresh=False):
+        """
+        Returns the stored artifact for this request if there is one. Otherwise retrieves
+        context, returns the cached artifact for exactly these chunks, or
+        build(docs) -> (content, valid) and caches valid content. `refresh` always rebuilds.
+        """
+        direct = None if refresh else self.cached(kind, query, subject, grade, filename)
+        if direct is not None:
+            print(f"{kind.capitalize()} served from pre-generated store.")
+            return direct
+
+        namespace, docs = self._retrieve(query, subject, grade, filename, k)
+        if not docs:
+            raise NoContentError(f"No content found to generate {kind}.")
+
+        version = self.pipeline.vector_store.source_version(namespace, filename)
+        key = self.artifacts.key(kind, namespace, filename, query, [content_hash(doc.page_content) for doc in docs])
+        cached = None if refresh else self.artifacts.get(key)
+        if cached is not None:
+            print(f"{kind.capitalize()} served from artifact cache.")
+            return cached
+
+        content, valid = build(docs)
+        if valid:
+            self.artifacts.put(key, kind, namespace, filename, query, content, version)
+        return content
+
+    def assessment(self, query, subject=None, grade=None, filename=None, refresh=False):
+        """
+        Flashcards and quiz as a dict (ASSESSMENT_SCHEMA). Raises ValueError if the LLM
+        produced no valid object.
+        """
+        def build(docs):
+            context, _ = self.pipeline.pack_context(docs, "assessment")
+            prompt = f"""You are an educational assessment expert for NCERT curriculum.
+Using the context below, generate high-quality study materials for a student.
+
+Context:
+{context}
+
+Output strictly in JSON format with the following structure:
+{{
+  "topic": "The main topic name",
+  "flashcards": [
+    {{"q": "Question/Term", "a": "Concise answer/definition"}},
+    ... (at least 4)
+  ],
+  "quiz": [
+    {{
+      "q": "Multiple choice question",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "correct": "Exact string of the correct option"
+    }},
+    ... (at least 3)
+  ]
+}}
+
+Ensure questions are diverse and cover key concepts from the context.
+"""
+            return self.pipeline.generate_json(prompt, ASSESSMENT_SCHEMA), True
+
+        return self._cached("assessment", query, subject, grade, filename, 8, build, refresh)
+
+    def mindmap(self, query, subject=None, grade=None, filename=None, refresh=False):
+        """
+        {"mindmap": Mermaid script}.
+        """
+        def build(docs):
+            context, _ = self.pipeline.pack_context(docs, "mindmap")
+            # Simplified prompt for smaller models
+            prompt = f"""Create a Mermaid.js mindmap for: {query}.
+
+        Rules:
+        1. Start strictly with 'mindmap'.
+        2. Next line must be '  root(({query}))'.
+        3. Use indentation for branches.
+        4. No descriptions with colons (:), just short distinctive concepts.
+        5. Output ONLY the code.
+
+        Context to use:
+        {context}
+        """
+            raw_response = self.pipeline.generate_text(prompt)
+            script, valid = clean_mindmap(raw_response, query)
+            return {"mindmap": script}, valid and raw_response != OFFLINE_ANSWER
+
+        return self._cached("mindmap", query, subject, grade, filename, 10, build, refresh)
+
+    def summary(self, query, subject=None, grade=None, filename=None, refresh=False):
+        """
+        {"summary": chapter summary text}.
+        """
+        def build(docs):
+            context, _ = self.pipeline.pack_context(docs, "summary")
+            prompt = f"""You are an NCERT study assistant. Write a concise revision summary of: {query}.
+
+Use ONLY the context below. Cover the key concepts, definitions and facts a student must
+remember, as short bullet points grouped under 3-5 headings.
+
+Context:
+{context}
+
+Summary:"""
+            text = self.pipeline.generate_text(prompt).strip()
+            return {"summary": text}, bool(text) and text != OFFLINE_ANSWER
+
+        return self._cached("summary", query, subject, grade, filename, 10, build, refresh)
+
+    def warm(self, books, kinds=("assessment", "mindmap"), report=None):
+        """
+        Generates (or confirms cached) artifacts for every book, with the same parameters the
+        UI sends for a chapter: query = title, the library subject, grade and filename.
+        """
+        self.artifacts.prune(self.pipeline.vector_store.source_version)
+        done, failed = 0, 0
+        total = len(books) * len(kinds)
+        for book in books:
+            for kind in kinds:
+                try:
+                    getattr(self, kind)(book["title"], subject=book["subject"], grade=book["grade"], filename=book["filename"])
+                except Exception as e:
+                    failed += 1
+                    print(f"Warming {kind} for {book['id']} failed: {e}")
+                done += 1
+                if report:
+                    report(progress=done, total=total)
+        return {"artifacts": done - failed, "failed": failed}